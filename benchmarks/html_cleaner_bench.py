@@ -0,0 +1,98 @@
+"""Benchmark the legacy and fast HTML cleaners on newsletter-sized bodies.
+
+Usage:
+    python -m benchmarks.html_cleaner_bench [--samples DIR] [--count N]
+
+``--samples`` points at a directory of ``*.html`` files (for example message
+bodies exported from a real mailbox). Without it, synthetic newsletters with
+inline CSS, layout tables, a hidden preheader and tracking pixels are used.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from maestro.processing.html_cleaner import HTMLCleaner
+
+_WORDS = (
+    "update team launch product weekly digest offer account invoice meeting schedule release notes "
+    "community webinar feature pricing customer growth roadmap security report summary"
+).split()
+
+
+def synthetic_newsletter(rng: random.Random, articles: int = 40) -> str:
+    """Build a ~80 KB marketing newsletter in the style of common ESP templates."""
+    css = "\n".join(f".c{i} {{ color: #{i:06x}; padding: {i % 9}px; font-family: Arial; }}" for i in range(300))
+    rows = []
+    for i in range(articles):
+        body = " ".join(rng.choice(_WORDS) for _ in range(120))
+        rows.append(
+            f'<tr><td class="c{i}" style="padding:12px"><table width="100%"><tr>'
+            f'<td><h2 style="margin:0">Story {i}: {rng.choice(_WORDS).title()}</h2>'
+            f'<p style="font-size:14px;line-height:20px">{body}</p>'
+            f'<a href="https://click.example.com/track?u={i}&amp;id={rng.getrandbits(64):x}">Read more &raquo;</a>'
+            f"</td></tr></table></td></tr>"
+        )
+    pixels = "".join(
+        f'<img src="https://open.example.com/o/{rng.getrandbits(64):x}.gif" width="1" height="1" alt="">' for _ in range(5)
+    )
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Digest</title>"
+        f"<style>{css}</style><script>var t={rng.random()};</script></head><body>"
+        '<div style="display:none;max-height:0;overflow:hidden">Preheader text you never see</div>'
+        f'<table width="600" align="center">{"".join(rows)}</table>'
+        f"<!-- footer --><p>Unsubscribe | Preferences</p>{pixels}</body></html>"
+    )
+
+
+def load_samples(directory: Path | None, count: int) -> List[str]:
+    if directory is not None:
+        return [path.read_text(encoding="utf-8", errors="ignore") for path in sorted(directory.glob("*.html"))]
+    rng = random.Random(0)
+    return [synthetic_newsletter(rng) for _ in range(count)]
+
+
+def _time(label: str, fn: Callable[[], object], total_bytes: int, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(
+        f"{label:<28} best {best * 1000:9.1f} ms  median {statistics.median(timings) * 1000:9.1f} ms  "
+        f"{total_bytes / best / 1e6:7.1f} MB/s"
+    )
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=Path, default=None, help="Directory of *.html bodies")
+    parser.add_argument("--count", type=int, default=200, help="Synthetic bodies to generate")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size for the batch API")
+    args = parser.parse_args()
+
+    bodies = load_samples(args.samples, args.count)
+    total_bytes = sum(len(body.encode("utf-8")) for body in bodies)
+    print(f"{len(bodies)} bodies, {total_bytes / 1e6:.1f} MB total, {total_bytes / max(len(bodies), 1) / 1e3:.0f} KB avg")
+
+    legacy = HTMLCleaner(mode="legacy", workers=1)
+    fast = HTMLCleaner(mode="fast", workers=1)
+    batch = HTMLCleaner(mode="fast", workers=args.workers)
+    batch.clean_many(bodies)  # warm the pool so startup is not measured
+
+    base = _time("legacy (bs4 + html2text)", lambda: [legacy.to_plain_text(b) for b in bodies], total_bytes)
+    single = _time("fast (lxml, serial)", lambda: [fast.to_plain_text(b) for b in bodies], total_bytes)
+    pooled = _time(f"fast (lxml, {batch.workers} procs)", lambda: batch.clean_many(bodies), total_bytes)
+    batch.close()
+
+    print(f"speedup serial: {base / single:.1f}x, pooled: {base / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark plain, assisted and prompt-lookup decoding for email drafts.
+
+Usage:
+    python -m benchmarks.speculative_bench [--assistant MODEL] [--lookup N] [--prompts N]
+
+The main model is ``MAESTRO_LLM_MODEL``. Each mode drafts replies to the same
+synthetic threads, one prompt at a time, and reports tokens/sec. The
+speculative modes also report the acceptance rate: the share of drafted
+candidate tokens that the main model kept.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List
+
+import torch
+from transformers.generation import candidate_generator
+
+from maestro.data.models import Email
+from maestro.nlp.llm import HFCausalLLM
+
+_WORDS = (
+    "invoice contract renewal meeting agenda budget forecast deadline shipment order delivery "
+    "schedule review approval payment quarter report customer onboarding migration release"
+).split()
+
+
+@dataclass
+class _Counters:
+    steps: int = 0
+    drafted: int = 0
+
+
+def synthetic_thread(rng: random.Random, emails: int = 3) -> List[Email]:
+    """Build retrieved context emails like the ones passed to ``generate_email_draft``."""
+    thread = []
+    for i in range(emails):
+        topic = " ".join(rng.choice(_WORDS) for _ in range(3))
+        body = " ".join(rng.choice(_WORDS) for _ in range(60))
+        thread.append(
+            Email(
+                subject=f"Re: {topic.title()}",
+                from_address=f"sender{i}@example.com",
+                plain_text=f"Hi,\n\nFollowing up on the {topic}. {body}\n\nThanks",
+                summary=None,
+            )
+        )
+    return thread
+
+
+@contextmanager
+def _count_candidates(counters: _Counters) -> Iterator[None]:
+    """Count verification steps and drafted tokens by wrapping the candidate generators."""
+    classes = (candidate_generator.AssistedCandidateGenerator, candidate_generator.PromptLookupCandidateGenerator)
+    originals = {cls: cls.get_candidates for cls in classes}
+
+    def wrap(original):
+        def get_candidates(self, input_ids, *args, **kwargs):
+            result = original(self, input_ids, *args, **kwargs)
+            counters.steps += 1
+            counters.drafted += result[0].shape[-1] - input_ids.shape[-1]
+            return result
+
+        return get_candidates
+
+    for cls, original in originals.items():
+        cls.get_candidates = wrap(original)
+    try:
+        yield
+    finally:
+        for cls, original in originals.items():
+            cls.get_candidates = original
+
+
+def run(llm: HFCausalLLM, label: str, prompts: List[str], max_new_tokens: int) -> float:
+    counters = _Counters()
+    new_tokens = 0
+    torch.manual_seed(0)
+    with _count_candidates(counters):
+        start = time.perf_counter()
+        for prompt in prompts:
+            new_tokens += llm.complete([prompt], max_new_tokens=max_new_tokens)[0].new_tokens
+        elapsed = time.perf_counter() - start
+    line = f"{label:<16} {new_tokens:6d} tokens  {elapsed:8.1f} s  {new_tokens / elapsed:7.2f} tok/s"
+    if counters.drafted:
+        accepted = max(new_tokens - counters.steps, 0)
+        line += f"  acceptance {accepted / counters.drafted:6.1%}  ({new_tokens / counters.steps:.2f} tok/step)"
+    print(line)
+    return new_tokens / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--assistant", default=None, help="Small model sharing the main tokenizer")
+    parser.add_argument("--lookup", type=int, default=10, help="Prompt-lookup candidate length (0 to skip)")
+    parser.add_argument("--prompts", type=int, default=5, help="Draft prompts to generate")
+    parser.add_argument("--max-new-tokens", type=int, default=256)
+    args = parser.parse_args()
+
+    llm = HFCausalLLM(assistant_model_name="", prompt_lookup_tokens=0)
+    rng = random.Random(0)
+    prompts = [
+        llm.build_draft_prompt("Reply confirming the details and next steps.", synthetic_thread(rng))
+        for _ in range(args.prompts)
+    ]
+    llm.complete([prompts[0]], max_new_tokens=8)  # warm up kernels and caches
+
+    base = run(llm, "plain", prompts, args.max_new_tokens)
+    if args.lookup > 0:
+        llm.prompt_lookup_tokens = args.lookup
+        lookup = run(llm, f"prompt lookup {args.lookup}", prompts, args.max_new_tokens)
+        print(f"prompt lookup speedup: {lookup / base:.2f}x")
+        llm.prompt_lookup_tokens = 0
+    if args.assistant:
+        llm.assistant_model = llm._load_assistant(args.assistant)
+        if llm.assistant_model is None:
+            print(f"{args.assistant} does not share the main tokenizer; skipping")
+            return
+        assisted = run(llm, "assisted", prompts, args.max_new_tokens)
+        print(f"assisted speedup: {assisted / base:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
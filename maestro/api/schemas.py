@@ -14,6 +14,7 @@ class EmailResponse(BaseModel):
     to_addresses: str
     date: datetime
     summary: Optional[str]
+    duplicate_of: Optional[int] = None
 
 
 class ImportRequest(BaseModel):
@@ -24,19 +25,49 @@ class ImportResponse(BaseModel):
     imported: int
 
 
+class SearchFilters(BaseModel):
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    from_address: Optional[str] = None
+    to_address: Optional[str] = None
+    thread_id: Optional[str] = None
+    has_summary: Optional[bool] = None
+
+
 class SearchRequest(BaseModel):
     query: str
     mode: Literal["keyword", "semantic", "hybrid"] = "semantic"
     limit: int = 20
+    filters: SearchFilters = Field(default_factory=SearchFilters)
+    cursor: Optional[str] = None
+    collapse_duplicates: bool = False
 
 
 class SearchResponse(BaseModel):
     results: List[EmailResponse]
+    next_cursor: Optional[str] = None
+
+
+class MailboxSearchRequest(SearchRequest):
+    mailboxes: Optional[List[str]] = None
+
+
+class MailboxEmailResponse(EmailResponse):
+    mailbox: str
+
+
+class MailboxSearchResponse(BaseModel):
+    results: List[MailboxEmailResponse]
+
+
+class MailboxListResponse(BaseModel):
+    mailboxes: List[str]
 
 
 class ChatRequest(BaseModel):
     messages: List[dict]
     top_k: int = 5
+    request_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -46,8 +77,23 @@ class ChatResponse(BaseModel):
 class DraftRequest(BaseModel):
     instruction: str
     related_query: Optional[str] = None
+    request_id: Optional[str] = None
 
 
 class DraftResponse(BaseModel):
     draft: str
 
+
+class ReindexRequest(BaseModel):
+    restart: bool = False
+
+
+class ReindexStatusResponse(BaseModel):
+    state: str
+    indexed: int
+    last_id: int
+    resumed_from: int
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    model: Optional[str] = None
@@ -1,22 +1,36 @@
 """FastAPI server exposing Maestro capabilities."""
 from __future__ import annotations
 
+import contextlib
 import logging
-from fastapi import FastAPI
+from concurrent.futures import CancelledError
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from maestro.core.config import settings
 from maestro.core.logging import configure_logging
+from maestro.data.filters import EmailFilters
 from maestro.data.repository import SqlAlchemyEmailRepository
 from maestro.gmail.client import GoogleGmailClient
 from maestro.processing.html_cleaner import HTMLCleaner
+from maestro.processing.near_duplicates import NearDuplicateIndex, index_path_for
 from maestro.nlp.embeddings import FaissEmbeddingIndex, HFEmbeddingModel
-from maestro.nlp.indexing import WordIndex
+from maestro.nlp.indexing import FacetIndex, IndexGeneration, WordIndex
 from maestro.nlp.llm import HFCausalLLM
+from maestro.nlp.scheduler import GenerationScheduler, QueueFullError, ScheduledLLM, generation_request
 from maestro.nlp.summarizer import HFSummarizer
 from maestro.services.chat_service import ChatService
 from maestro.services.drafting_service import DraftingService
 from maestro.services.email_ingestion import EmailIngestionService
+from maestro.services.export_service import ExportService
+from maestro.services.reindex_service import ReindexService
+from maestro.services.search_cache import SearchResultCache
 from maestro.services.search_service import SearchService
+from maestro.services.shard_service import ScatterGatherSearch, ShardManager, ShardWorkerPool
+from maestro.services.summary_service import SummaryBackfillWorker, SummaryService
 from maestro.api.schemas import (
     ChatRequest,
     ChatResponse,
@@ -25,6 +39,12 @@ from maestro.api.schemas import (
     EmailResponse,
     ImportRequest,
     ImportResponse,
+    MailboxEmailResponse,
+    MailboxListResponse,
+    MailboxSearchRequest,
+    MailboxSearchResponse,
+    ReindexRequest,
+    ReindexStatusResponse,
     SearchRequest,
     SearchResponse,
 )
@@ -42,8 +62,13 @@ embedding_model = HFEmbeddingModel()
 _sample_vec = embedding_model.embed_texts(["bootstrap"])
 embedding_index = FaissEmbeddingIndex(dim=_sample_vec.shape[1])
 word_index = WordIndex()
+facet_index = FacetIndex()
+facet_index.build(repository.facet_rows())
+index_generation = IndexGeneration()
 summarizer = HFSummarizer()
 llm_client = HFCausalLLM()
+generation_scheduler = GenerationScheduler(llm_client)
+scheduled_llm = ScheduledLLM(generation_scheduler)
 ingestion_service = EmailIngestionService(
     gmail_client=gmail_client,
     repository=repository,
@@ -52,10 +77,40 @@ ingestion_service = EmailIngestionService(
     embedding_index=embedding_index,
     summarizer=summarizer,
     word_index=word_index,
+    facet_index=facet_index,
+    generation=index_generation,
+    near_duplicates=NearDuplicateIndex(index_path_for(settings.database_url)),
+)
+summary_service = SummaryService(repository, summarizer, facet_index=facet_index)
+summary_backfill = SummaryBackfillWorker(summary_service)
+search_service = SearchService(
+    repository,
+    embedding_model,
+    embedding_index,
+    summary_service,
+    facet_index,
+    cache=SearchResultCache(index_generation),
 )
-search_service = SearchService(repository, embedding_model, embedding_index)
-chat_service = ChatService(search_service, llm_client)
-drafting_service = DraftingService(llm_client, search_service)
+chat_service = ChatService(search_service, scheduled_llm)
+drafting_service = DraftingService(scheduled_llm, search_service)
+export_service = ExportService(repository)
+shard_manager = ShardManager(embedding_model, _sample_vec.shape[1], cleaner=cleaner, summarizer=summarizer)
+shard_pool = ShardWorkerPool(shard_manager.root, shard_manager.dim)
+shard_search = ScatterGatherSearch(shard_manager, shard_pool)
+reindex_service = ReindexService(repository, embedding_model, embedding_index, word_index, index_generation)
+
+
+@app.on_event("startup")
+def start_background_workers() -> None:
+    summary_backfill.start()
+
+
+@app.on_event("shutdown")
+def stop_background_workers() -> None:
+    summary_backfill.stop()
+    shard_pool.stop()
+    generation_scheduler.stop()
+    repository.close()
 
 
 @app.post("/emails/import/gmail", response_model=ImportResponse)
@@ -64,41 +119,162 @@ def import_gmail(payload: ImportRequest) -> ImportResponse:
     return ImportResponse(imported=imported)
 
 
+def _to_responses(emails) -> List[EmailResponse]:
+    return [
+        EmailResponse(
+            id=email.id,
+            subject=email.subject,
+            from_address=email.from_address,
+            to_addresses=email.to_addresses,
+            date=email.date,
+            summary=email.summary,
+            duplicate_of=email.duplicate_of,
+        )
+        for email in emails
+    ]
+
+
 @app.post("/emails/search", response_model=SearchResponse)
 def search(payload: SearchRequest) -> SearchResponse:
-    if payload.mode == "keyword":
-        emails = search_service.search_keyword(payload.query, limit=payload.limit)
-    elif payload.mode == "hybrid":
-        emails = search_service.search_hybrid(payload.query, limit=payload.limit)
-    else:
-        emails = search_service.search_semantic(payload.query, limit=payload.limit)
-    return SearchResponse(
+    filters = EmailFilters(**payload.filters.model_dump())
+    try:
+        page = search_service.search_page(
+            payload.query,
+            mode=payload.mode,
+            limit=payload.limit,
+            filters=filters,
+            cursor=payload.cursor,
+            collapse=payload.collapse_duplicates,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return SearchResponse(results=_to_responses(page.emails), next_cursor=page.next_cursor)
+
+
+@app.get("/emails", response_model=SearchResponse)
+def list_emails(limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None) -> SearchResponse:
+    try:
+        page = search_service.list_page(limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return SearchResponse(results=_to_responses(page.emails), next_cursor=page.next_cursor)
+
+
+@app.get("/emails/export")
+def export_emails(
+    include_html: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    from_address: Optional[str] = None,
+    to_address: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    has_summary: Optional[bool] = None,
+) -> StreamingResponse:
+    filters = EmailFilters(
+        date_from=date_from,
+        date_to=date_to,
+        from_address=from_address,
+        to_address=to_address,
+        thread_id=thread_id,
+        has_summary=has_summary,
+    )
+    return StreamingResponse(
+        export_service.iter_ndjson(filters=filters, include_html=include_html), media_type="application/x-ndjson"
+    )
+
+
+@app.get("/mailboxes", response_model=MailboxListResponse)
+def list_mailboxes() -> MailboxListResponse:
+    return MailboxListResponse(mailboxes=shard_manager.list_mailboxes())
+
+
+@app.post("/mailboxes/{mailbox}/import/gmail", response_model=ImportResponse)
+def import_mailbox(mailbox: str, payload: ImportRequest) -> ImportResponse:
+    try:
+        imported = shard_manager.sync_mailbox(mailbox, max_results=payload.max_results or 200)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return ImportResponse(imported=imported)
+
+
+@app.post("/mailboxes/search", response_model=MailboxSearchResponse)
+def search_mailboxes(payload: MailboxSearchRequest) -> MailboxSearchResponse:
+    if payload.cursor:
+        raise HTTPException(status_code=400, detail="Cross-mailbox search does not support cursors")
+    if payload.collapse_duplicates:
+        raise HTTPException(status_code=400, detail="Cross-mailbox search does not collapse duplicates")
+    try:
+        hits = shard_search.search(
+            payload.query,
+            mode=payload.mode,
+            limit=payload.limit,
+            filters=EmailFilters(**payload.filters.model_dump()),
+            mailboxes=payload.mailboxes,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return MailboxSearchResponse(
         results=[
-            EmailResponse(
-                id=email.id,
-                subject=email.subject,
-                from_address=email.from_address,
-                to_addresses=email.to_addresses,
-                date=email.date,
-                summary=email.summary,
-            )
-            for email in emails
+            MailboxEmailResponse(mailbox=hit.mailbox, **response.model_dump())
+            for hit, response in zip(hits, _to_responses(hit.email for hit in hits))
         ]
     )
 
 
+@contextlib.contextmanager
+def _generation_errors(request_id: Optional[str]):
+    with generation_request(request_id):
+        try:
+            yield
+        except QueueFullError as exc:
+            raise HTTPException(status_code=429, detail=str(exc)) from exc
+        except CancelledError as exc:
+            raise HTTPException(status_code=409, detail="Generation was cancelled") from exc
+        except TimeoutError as exc:
+            raise HTTPException(status_code=504, detail=str(exc)) from exc
+
+
 @app.post("/chat", response_model=ChatResponse)
 def chat(payload: ChatRequest) -> ChatResponse:
-    reply = chat_service.chat_with_emails(payload.messages, top_k=payload.top_k)
+    with _generation_errors(payload.request_id):
+        reply = chat_service.chat_with_emails(payload.messages, top_k=payload.top_k)
     return ChatResponse(reply=reply)
 
 
 @app.post("/emails/draft", response_model=DraftResponse)
 def draft_email(payload: DraftRequest) -> DraftResponse:
-    draft = drafting_service.draft_email(payload.instruction, payload.related_query)
+    with _generation_errors(payload.request_id):
+        draft = drafting_service.draft_email(payload.instruction, payload.related_query)
     return DraftResponse(draft=draft)
 
 
+@app.post("/generations/{request_id}/cancel")
+def cancel_generation(request_id: str) -> dict[str, bool]:
+    return {"cancelled": generation_scheduler.cancel(request_id)}
+
+
+@app.get("/metrics/generation")
+def generation_metrics() -> dict:
+    return generation_scheduler.stats()
+
+
+@app.post("/admin/reindex", response_model=ReindexStatusResponse, status_code=202)
+def start_reindex(payload: ReindexRequest) -> ReindexStatusResponse:
+    if not reindex_service.start_background(restart=payload.restart):
+        raise HTTPException(status_code=409, detail="A reindex is already running")
+    return ReindexStatusResponse(**reindex_service.status.to_dict())
+
+
+@app.get("/admin/reindex", response_model=ReindexStatusResponse)
+def reindex_status() -> ReindexStatusResponse:
+    return ReindexStatusResponse(**reindex_service.status.to_dict())
+
+
+@app.get("/metrics/search-cache")
+def search_cache_metrics() -> dict:
+    return search_service.cache_stats()
+
+
 @app.get("/")
 def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
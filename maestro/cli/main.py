@@ -1,25 +1,45 @@
 """Typer-based CLI entrypoint."""
 from __future__ import annotations
 
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
 import typer
 
 from maestro.core.logging import configure_logging
-from maestro.data.repository import SqlAlchemyEmailRepository
-from maestro.gmail.client import GoogleGmailClient
-from maestro.processing.html_cleaner import HTMLCleaner
-from maestro.nlp.embeddings import FaissEmbeddingIndex, HFEmbeddingModel
-from maestro.nlp.indexing import WordIndex
-from maestro.nlp.llm import HFCausalLLM
-from maestro.nlp.summarizer import HFSummarizer
-from maestro.services.chat_service import ChatService
-from maestro.services.drafting_service import DraftingService
-from maestro.services.email_ingestion import EmailIngestionService
-from maestro.services.search_service import SearchService
+from maestro.daemon.client import DaemonClient, DaemonError, DaemonUnavailable
+from maestro.daemon.protocol import filters_to_dict, page_to_dict
+from maestro.data.filters import EmailFilters
+
+if TYPE_CHECKING:
+    from maestro.services.shard_service import ShardManager
+
+# Model, index and service modules pull in torch, transformers and faiss, which
+# take seconds to import. They are imported inside the functions that need them
+# so commands answered by the daemon start instantly.
 
 app = typer.Typer(help="Interact with Maestro locally")
 
 
-def bootstrap_services():
+def bootstrap_services(scheduled: bool = False):
+    from maestro.data.repository import SqlAlchemyEmailRepository
+    from maestro.gmail.client import GoogleGmailClient
+    from maestro.nlp.embeddings import FaissEmbeddingIndex, HFEmbeddingModel
+    from maestro.nlp.indexing import FacetIndex, IndexGeneration, WordIndex
+    from maestro.nlp.llm import HFCausalLLM
+    from maestro.nlp.scheduler import GenerationScheduler, ScheduledLLM
+    from maestro.nlp.summarizer import HFSummarizer
+    from maestro.processing.html_cleaner import HTMLCleaner
+    from maestro.processing.near_duplicates import NearDuplicateIndex
+    from maestro.services.chat_service import ChatService
+    from maestro.services.drafting_service import DraftingService
+    from maestro.services.email_ingestion import EmailIngestionService
+    from maestro.services.search_cache import SearchResultCache
+    from maestro.services.search_service import SearchService
+    from maestro.services.summary_service import SummaryService
+
     configure_logging()
     repo = SqlAlchemyEmailRepository()
     gmail = GoogleGmailClient()
@@ -28,8 +48,14 @@ def bootstrap_services():
     dim = embedding_model.embed_texts(["bootstrap"]).shape[1]
     embedding_index = FaissEmbeddingIndex(dim=dim)
     word_index = WordIndex()
+    facet_index = FacetIndex()
+    facet_index.build(repo.facet_rows())
+    generation = IndexGeneration()
     summarizer = HFSummarizer()
     llm = HFCausalLLM()
+    if scheduled:
+        # Concurrent daemon clients share the model through the batching scheduler.
+        llm = ScheduledLLM(GenerationScheduler(llm))
 
     ingestion = EmailIngestionService(
         gmail_client=gmail,
@@ -39,36 +65,119 @@ def bootstrap_services():
         embedding_index=embedding_index,
         summarizer=summarizer,
         word_index=word_index,
+        facet_index=facet_index,
+        generation=generation,
+        near_duplicates=NearDuplicateIndex(),
+    )
+    summaries = SummaryService(repo, summarizer, facet_index=facet_index)
+    search = SearchService(
+        repo, embedding_model, embedding_index, summaries, facet_index, cache=SearchResultCache(generation)
     )
-    search = SearchService(repo, embedding_model, embedding_index)
     chat = ChatService(search, llm)
     draft = DraftingService(llm, search)
-    return ingestion, search, chat, draft
+    return ingestion, search, chat, draft, summaries
+
+
+def _via_daemon(method: str, **params):
+    """Run ``method`` on the resident daemon; returns None when no daemon is running."""
+    try:
+        return DaemonClient().call(method, **params)
+    except DaemonUnavailable:
+        return None
+    except DaemonError as exc:
+        typer.echo(f"Error: {exc}", err=True)
+        raise typer.Exit(1) from exc
 
 
 @app.command()
 def sync_gmail(max_results: int = typer.Option(200, help="Max emails to fetch")):
-    ingestion, *_ = bootstrap_services()
-    imported = ingestion.sync_gmail(max_results=max_results)
-    typer.echo(f"Imported {imported} emails")
+    result = _via_daemon("sync_gmail", max_results=max_results)
+    if result is None:
+        ingestion, *_ = bootstrap_services()
+        result = {"imported": ingestion.sync_gmail(max_results=max_results)}
+    typer.echo(f"Imported {result['imported']} emails")
+
+
+def _echo_page(page: dict) -> None:
+    for email in page["emails"]:
+        typer.echo(f"[{email['id']}] {email['subject']} - {email['summary'] or email['snippet']}")
+    if page["next_cursor"]:
+        typer.echo(f"Next page: --cursor {page['next_cursor']}")
+
+
+@app.command()
+def search(
+    query: str,
+    mode: str = typer.Option("semantic", help="keyword|semantic|hybrid"),
+    limit: int = typer.Option(20, help="Results per page"),
+    cursor: Optional[str] = typer.Option(None, help="Continuation token from a previous page"),
+    after: Optional[datetime] = typer.Option(None, help="Only emails on or after this date"),
+    before: Optional[datetime] = typer.Option(None, help="Only emails on or before this date"),
+    sender: Optional[str] = typer.Option(None, "--from", help="Sender address contains"),
+    recipient: Optional[str] = typer.Option(None, "--to", help="To/Cc addresses contain"),
+    thread: Optional[str] = typer.Option(None, help="Restrict to a Gmail thread id"),
+    has_summary: Optional[bool] = typer.Option(None, "--has-summary/--no-summary", help="Filter by summary state"),
+    collapse: bool = typer.Option(False, help="Show one hit per near-duplicate cluster"),
+):
+    filters = EmailFilters(
+        date_from=after,
+        date_to=before,
+        from_address=sender,
+        to_address=recipient,
+        thread_id=thread,
+        has_summary=has_summary,
+    )
+    page = _via_daemon(
+        "search", query=query, mode=mode, limit=limit, filters=filters_to_dict(filters), cursor=cursor, collapse=collapse
+    )
+    if page is None:
+        _, search_service, *_ = bootstrap_services()
+        page = page_to_dict(
+            search_service.search_page(query, mode=mode, limit=limit, filters=filters, cursor=cursor, collapse=collapse)
+        )
+    _echo_page(page)
 
 
 @app.command()
-def search(query: str, mode: str = typer.Option("semantic", help="keyword|semantic|hybrid")):
-    _, search_service, _, _ = bootstrap_services()
-    if mode == "keyword":
-        emails = search_service.search_keyword(query)
-    elif mode == "hybrid":
-        emails = search_service.search_hybrid(query)
-    else:
-        emails = search_service.search_semantic(query)
-    for email in emails:
-        typer.echo(f"[{email.id}] {email.subject} - {email.summary or email.plain_text[:120]}")
+def recent(
+    limit: int = typer.Option(50, help="Emails per page"),
+    cursor: Optional[str] = typer.Option(None, help="Continuation token from a previous page"),
+):
+    page = _via_daemon("recent", limit=limit, cursor=cursor)
+    if page is None:
+        _, search_service, *_ = bootstrap_services()
+        page = page_to_dict(search_service.list_page(limit=limit, cursor=cursor))
+    _echo_page(page)
+
+
+@app.command()
+def export(
+    output: Optional[Path] = typer.Option(None, help="Write NDJSON here instead of stdout"),
+    include_html: bool = typer.Option(False, help="Include the raw HTML body"),
+    after: Optional[datetime] = typer.Option(None, help="Only emails on or after this date"),
+    before: Optional[datetime] = typer.Option(None, help="Only emails on or before this date"),
+):
+    from maestro.data.repository import SqlAlchemyEmailRepository
+    from maestro.services.export_service import ExportService
+
+    # NDJSON may go to stdout, so keep log lines out of it.
+    configure_logging(stream=sys.stderr)
+    # Export only needs storage, so skip loading models and Gmail credentials.
+    exporter = ExportService(SqlAlchemyEmailRepository())
+    filters = EmailFilters(date_from=after, date_to=before)
+    if output is None:
+        exporter.export(sys.stdout, filters=filters, include_html=include_html)
+        return
+    with open(output, "w", encoding="utf-8") as out:
+        count = exporter.export(out, filters=filters, include_html=include_html)
+    typer.echo(f"Exported {count} emails to {output}", err=True)
 
 
 @app.command()
 def chat():
-    _, _, chat_service, _ = bootstrap_services()
+    chat_service = None
+    if not DaemonClient().ping():
+        _, _, chat_service, *_ = bootstrap_services()
     history: list[dict] = []
     typer.echo("Starting Maestro chat. Type 'exit' to quit.")
     while True:
@@ -76,16 +185,148 @@ def chat():
         if message.strip().lower() in {"exit", "quit"}:
             break
         history.append({"role": "user", "content": message})
-        reply = chat_service.chat_with_emails(history)
+        result = _via_daemon("chat", history=history) if chat_service is None else None
+        if result is not None:
+            reply = result["reply"]
+        else:
+            if chat_service is None:
+                # The daemon went away mid-session; carry on in-process with the same history.
+                typer.echo("Daemon stopped; loading models locally", err=True)
+                _, _, chat_service, *_ = bootstrap_services()
+            reply = chat_service.chat_with_emails(history)
         history.append({"role": "assistant", "content": reply})
         typer.echo(f"Maestro: {reply}")
 
 
 @app.command()
 def draft(instruction: str, related_query: str = typer.Option(None, help="Optional related search query")):
-    _, _, _, drafting = bootstrap_services()
-    draft_text = drafting.draft_email(instruction, related_query)
-    typer.echo(draft_text)
+    result = _via_daemon("draft", instruction=instruction, related_query=related_query)
+    if result is None:
+        _, _, _, drafting, _ = bootstrap_services()
+        result = {"draft": drafting.draft_email(instruction, related_query)}
+    typer.echo(result["draft"])
+
+
+@app.command()
+def backfill_summaries(batch_size: int = typer.Option(16, help="Emails summarized per batch")):
+    summaries = None
+    if not DaemonClient().ping():
+        *_, summaries = bootstrap_services()
+    total = 0
+    while True:
+        result = _via_daemon("backfill_summaries", batch_size=batch_size) if summaries is None else None
+        if result is not None:
+            done = result["summarized"]
+        else:
+            if summaries is None:
+                typer.echo("Daemon stopped; loading models locally", err=True)
+                *_, summaries = bootstrap_services()
+            done = summaries.backfill(limit=batch_size)
+        if not done:
+            break
+        total += done
+        typer.echo(f"Summarized {total} emails")
+    typer.echo(f"Backfill complete ({total} emails)")
+
+
+@app.command()
+def reindex(
+    restart: bool = typer.Option(False, help="Ignore any checkpoint and rebuild from scratch"),
+    chunk_size: Optional[int] = typer.Option(None, help="Rows read from SQLite per chunk"),
+    batch_size: Optional[int] = typer.Option(None, help="Texts per embedding forward pass"),
+    workers: Optional[int] = typer.Option(None, help="Embedding worker processes (CPU only)"),
+):
+    from maestro.data.repository import SqlAlchemyEmailRepository
+    from maestro.nlp.embeddings import FaissEmbeddingIndex, HFEmbeddingModel
+    from maestro.nlp.indexing import WordIndex
+    from maestro.services.reindex_service import ReindexService
+
+    if DaemonClient().ping():
+        # The daemon keeps its own FAISS index in memory and would overwrite the rebuilt file on its next sync.
+        typer.echo("A Maestro daemon is running; stop it with `daemon-stop` before reindexing", err=True)
+        raise typer.Exit(1)
+    configure_logging()
+    # Reindexing only needs storage and the embedding model.
+    repo = SqlAlchemyEmailRepository()
+    embedding_model = HFEmbeddingModel()
+    dim = embedding_model.embed_texts(["bootstrap"]).shape[1]
+    service = ReindexService(
+        repo,
+        embedding_model,
+        FaissEmbeddingIndex(dim=dim),
+        WordIndex(),
+        chunk_size=chunk_size,
+        batch_size=batch_size,
+        workers=workers,
+    )
+    status = service.reindex(restart=restart)
+    typer.echo(f"Reindexed {status.indexed} emails (resumed from id {status.resumed_from})")
+
+
+@app.command()
+def daemon():
+    from maestro.daemon.server import MaestroDaemon
+
+    ingestion, search, chat_service, drafting, summaries = bootstrap_services(scheduled=True)
+    MaestroDaemon(ingestion, search, chat_service, drafting, summaries).serve_forever()
+
+
+@app.command()
+def daemon_status():
+    result = _via_daemon("ping")
+    if result is None:
+        typer.echo("No daemon is running")
+        raise typer.Exit(1)
+    typer.echo(f"Daemon pid {result['pid']}, up {result['uptime']:.0f}s, search cache {result['search_cache']}")
+
+
+@app.command()
+def daemon_stop():
+    if _via_daemon("shutdown") is None:
+        typer.echo("No daemon is running")
+        return
+    typer.echo("Daemon stopping")
+
+
+def _shard_manager(with_ingestion: bool = False) -> ShardManager:
+    from maestro.nlp.embeddings import HFEmbeddingModel
+    from maestro.nlp.summarizer import HFSummarizer
+    from maestro.processing.html_cleaner import HTMLCleaner
+    from maestro.services.shard_service import ShardManager
+
+    configure_logging()
+    embedding_model = HFEmbeddingModel()
+    dim = embedding_model.embed_texts(["bootstrap"]).shape[1]
+    if with_ingestion:
+        return ShardManager(embedding_model, dim, cleaner=HTMLCleaner(), summarizer=HFSummarizer())
+    return ShardManager(embedding_model, dim)
+
+
+@app.command()
+def sync_mailbox(mailbox: str, max_results: int = typer.Option(200, help="Max emails to fetch")):
+    imported = _shard_manager(with_ingestion=True).sync_mailbox(mailbox, max_results=max_results)
+    typer.echo(f"Imported {imported} emails into {mailbox}")
+
+
+@app.command()
+def search_mailboxes(
+    query: str,
+    mailbox: Optional[list[str]] = typer.Option(None, help="Mailbox to search; repeat for several (default: all)"),
+    mode: str = typer.Option("semantic", help="keyword|semantic|hybrid"),
+    limit: int = typer.Option(20, help="Results to return"),
+    workers: int = typer.Option(0, help="Shard worker processes; 0 searches in-process"),
+):
+    from maestro.services.shard_service import ScatterGatherSearch, ShardWorkerPool
+
+    manager = _shard_manager()
+    pool = ShardWorkerPool(manager.root, manager.dim, workers=workers) if workers > 0 else None
+    try:
+        hits = ScatterGatherSearch(manager, pool).search(query, mode=mode, limit=limit, mailboxes=mailbox)
+    finally:
+        if pool is not None:
+            pool.stop()
+    for hit in hits:
+        typer.echo(f"[{hit.mailbox}:{hit.email.id}] {hit.email.subject} - {hit.email.plain_text[:120]}")
 
 
 if __name__ == "__main__":
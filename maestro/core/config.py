@@ -22,6 +22,37 @@ class Settings:
     llm_model_name: str = os.getenv("MAESTRO_LLM_MODEL", "mistralai/Mistral-7B-Instruct-v0.2")
     gmail_credentials_path: Path = Path(os.getenv("MAESTRO_GMAIL_CREDENTIALS", "./config/credentials.json"))
     gmail_token_path: Path = Path(os.getenv("MAESTRO_GMAIL_TOKEN", "./config/token.json"))
+    html_cleaner_mode: str = os.getenv("MAESTRO_HTML_CLEANER", "fast")
+    cleaner_workers: int = int(os.getenv("MAESTRO_CLEANER_WORKERS", "0"))
+    summarize_on_ingest: bool = os.getenv("MAESTRO_SUMMARIZE_ON_INGEST", "false").lower() == "true"
+    summary_batch_size: int = int(os.getenv("MAESTRO_SUMMARY_BATCH_SIZE", "16"))
+    summary_backfill_idle_seconds: float = float(os.getenv("MAESTRO_SUMMARY_BACKFILL_IDLE", "30"))
+    search_cache_size: int = int(os.getenv("MAESTRO_SEARCH_CACHE_SIZE", "1024"))
+    search_cache_ttl: float = float(os.getenv("MAESTRO_SEARCH_CACHE_TTL", "300"))
+    reindex_chunk_size: int = int(os.getenv("MAESTRO_REINDEX_CHUNK_SIZE", "2048"))
+    reindex_batch_size: int = int(os.getenv("MAESTRO_REINDEX_BATCH_SIZE", "128"))
+    reindex_workers: int = int(os.getenv("MAESTRO_REINDEX_WORKERS", "1"))
+    reindex_checkpoint_seconds: float = float(os.getenv("MAESTRO_REINDEX_CHECKPOINT_SECONDS", "60"))
+    mailboxes_dir: Path = Path(os.getenv("MAESTRO_MAILBOXES_DIR", "./data/mailboxes"))
+    shard_workers: int = int(os.getenv("MAESTRO_SHARD_WORKERS", "2"))
+    storage_mode: str = os.getenv("MAESTRO_STORAGE_MODE", "default")
+    sqlite_mmap_size: int = int(os.getenv("MAESTRO_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    sqlite_cache_size_kib: int = int(os.getenv("MAESTRO_SQLITE_CACHE_KIB", str(64 * 1024)))
+    sqlite_busy_timeout_ms: int = int(os.getenv("MAESTRO_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    sqlite_read_pool_size: int = int(os.getenv("MAESTRO_SQLITE_READ_POOL", "8"))
+    sqlite_write_batch: int = int(os.getenv("MAESTRO_SQLITE_WRITE_BATCH", "64"))
+    sqlite_write_linger_ms: float = float(os.getenv("MAESTRO_SQLITE_WRITE_LINGER_MS", "2"))
+    llm_max_batch_size: int = int(os.getenv("MAESTRO_LLM_MAX_BATCH", "8"))
+    llm_batch_window_ms: float = float(os.getenv("MAESTRO_LLM_BATCH_WINDOW_MS", "15"))
+    llm_max_queue: int = int(os.getenv("MAESTRO_LLM_MAX_QUEUE", "64"))
+    llm_max_padding_ratio: float = float(os.getenv("MAESTRO_LLM_MAX_PADDING_RATIO", "0.5"))
+    llm_starvation_seconds: float = float(os.getenv("MAESTRO_LLM_STARVATION_SECONDS", "20"))
+    llm_request_timeout: float = float(os.getenv("MAESTRO_LLM_REQUEST_TIMEOUT", "180"))
+    llm_assistant_model_name: str = os.getenv("MAESTRO_LLM_ASSISTANT_MODEL", "")
+    llm_prompt_lookup_tokens: int = int(os.getenv("MAESTRO_LLM_PROMPT_LOOKUP_TOKENS", "0"))
+    near_duplicate_mode: str = os.getenv("MAESTRO_NEAR_DUPLICATES", "reuse")
+    near_duplicate_threshold: float = float(os.getenv("MAESTRO_NEAR_DUPLICATE_THRESHOLD", "0.9"))
+    daemon_socket_path: Path = Path(os.getenv("MAESTRO_DAEMON_SOCKET", "./data/maestro.sock"))
     device: str = "cuda" if os.getenv("MAESTRO_DEVICE", "cuda") == "cuda" else "cpu"
 
 
@@ -3,13 +3,14 @@ from __future__ import annotations
 
 import logging
 import sys
+from typing import TextIO
 
 
-def configure_logging(level: int = logging.INFO) -> None:
-    """Configure application-wide logging."""
+def configure_logging(level: int = logging.INFO, stream: TextIO | None = None) -> None:
+    """Configure application-wide logging (to stdout unless ``stream`` is given)."""
     logging.basicConfig(
         level=level,
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
+        handlers=[logging.StreamHandler(stream or sys.stdout)],
     )
 
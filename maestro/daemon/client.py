@@ -0,0 +1,60 @@
+"""Client side of the Maestro daemon socket."""
+from __future__ import annotations
+
+import socket
+from pathlib import Path
+from typing import Any
+
+from maestro.core.config import settings
+from maestro.daemon.protocol import encode, read_message
+
+
+class DaemonUnavailable(ConnectionError):
+    """No daemon is listening on the socket."""
+
+
+class DaemonError(RuntimeError):
+    """The daemon received the request but could not complete it."""
+
+
+class DaemonClient:
+    """Send requests to a running ``MaestroDaemon`` over its Unix domain socket."""
+
+    def __init__(self, socket_path: Path | None = None, connect_timeout: float = 1.0) -> None:
+        self.socket_path = Path(socket_path or settings.daemon_socket_path)
+        self.connect_timeout = connect_timeout
+
+    def call(self, method: str, **params: Any) -> Any:
+        """Run ``method`` on the daemon and return its result.
+
+        Raises ``DaemonUnavailable`` when nothing is listening, so callers can
+        fall back to running in-process.
+        """
+        if not self.socket_path.exists():
+            raise DaemonUnavailable(f"No daemon socket at {self.socket_path}")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.connect_timeout)
+            try:
+                sock.connect(str(self.socket_path))
+            except (FileNotFoundError, ConnectionRefusedError, socket.timeout) as exc:
+                raise DaemonUnavailable(f"Daemon at {self.socket_path} is not responding") from exc
+            # Generation can take minutes; wait for as long as the daemon works.
+            sock.settimeout(None)
+            sock.sendall(encode({"method": method, "params": params}))
+            with sock.makefile("rb") as stream:
+                response = read_message(stream)
+        finally:
+            sock.close()
+        if response is None:
+            raise DaemonError("Daemon closed the connection without replying")
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Unknown daemon error"))
+        return response.get("result")
+
+    def ping(self) -> bool:
+        try:
+            self.call("ping")
+        except (DaemonUnavailable, DaemonError):
+            return False
+        return True
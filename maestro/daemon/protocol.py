@@ -0,0 +1,73 @@
+"""Wire format shared by the Maestro daemon and its CLI client.
+
+Each connection carries one request and one response, both single lines of
+JSON: ``{"method": ..., "params": {...}}`` and ``{"ok": true, "result": ...}``
+or ``{"ok": false, "error": ...}``.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, fields
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Optional
+
+from maestro.data.filters import EmailFilters
+
+if TYPE_CHECKING:  # the CLI imports this module before deciding whether to load models
+    from maestro.data.models import Email
+    from maestro.services.search_service import SearchPage
+
+# Generous cap so a runaway peer cannot make the other side buffer without bound.
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, default=_json_default).encode("utf-8") + b"\n"
+
+
+def read_message(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Read one message, or None if the peer closed the connection first."""
+    line = stream.readline(MAX_MESSAGE_BYTES + 1)
+    if not line:
+        return None
+    if len(line) > MAX_MESSAGE_BYTES:
+        raise ValueError("Message too large")
+    return json.loads(line)
+
+
+def filters_to_dict(filters: EmailFilters | None) -> Optional[Dict[str, Any]]:
+    if filters is None or filters.is_empty():
+        return None
+    return {key: value for key, value in asdict(filters).items() if value is not None}
+
+
+def filters_from_dict(data: Dict[str, Any] | None) -> Optional[EmailFilters]:
+    if not data:
+        return None
+    known = {field.name for field in fields(EmailFilters)}
+    values = {key: value for key, value in data.items() if key in known}
+    for key in ("date_from", "date_to"):
+        if values.get(key) is not None:
+            values[key] = datetime.fromisoformat(values[key])
+    return EmailFilters(**values)
+
+
+def email_to_dict(email: Email) -> Dict[str, Any]:
+    """The fields the CLI prints for a result."""
+    return {
+        "id": email.id,
+        "subject": email.subject,
+        "summary": email.summary,
+        "snippet": email.plain_text[:120],
+        "duplicate_of": email.duplicate_of,
+    }
+
+
+def page_to_dict(page: SearchPage) -> Dict[str, Any]:
+    return {"emails": [email_to_dict(email) for email in page.emails], "next_cursor": page.next_cursor}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
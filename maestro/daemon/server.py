@@ -0,0 +1,154 @@
+"""Long-running process that keeps Maestro's models and indexes warm for the CLI."""
+from __future__ import annotations
+
+import logging
+import os
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from maestro.core.config import settings
+from maestro.daemon.client import DaemonClient
+from maestro.daemon.protocol import encode, filters_from_dict, page_to_dict, read_message
+from maestro.services.chat_service import ChatService
+from maestro.services.drafting_service import DraftingService
+from maestro.services.email_ingestion import EmailIngestionService
+from maestro.services.search_service import SearchService
+from maestro.services.summary_service import SummaryBackfillWorker, SummaryService
+
+logger = logging.getLogger(__name__)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class MaestroDaemon:
+    """Serve CLI requests over a Unix domain socket from services loaded once.
+
+    Models, the FAISS index, the search cache and the Gmail credentials stay
+    in memory between commands, so a repeat search costs a socket round trip
+    instead of a cold start. The socket is created with owner-only permissions.
+    """
+
+    def __init__(
+        self,
+        ingestion: EmailIngestionService,
+        search: SearchService,
+        chat: ChatService,
+        drafting: DraftingService,
+        summaries: SummaryService,
+        socket_path: Path | None = None,
+    ) -> None:
+        self.ingestion = ingestion
+        self.search = search
+        self.chat = chat
+        self.drafting = drafting
+        self.summaries = summaries
+        self.socket_path = Path(socket_path or settings.daemon_socket_path)
+        self.backfill = SummaryBackfillWorker(summaries)
+        self.started_at = time.time()
+        # Syncs mutate the shared indexes; run one at a time.
+        self._sync_lock = threading.Lock()
+        self._server: _Server | None = None
+        self._handlers: Dict[str, Callable[..., Any]] = {
+            "ping": self._ping,
+            "search": self._search,
+            "recent": self._recent,
+            "chat": self._chat,
+            "draft": self._draft,
+            "sync_gmail": self._sync_gmail,
+            "backfill_summaries": self._backfill_summaries,
+            "shutdown": self._shutdown,
+        }
+
+    def serve_forever(self) -> None:
+        self._prepare_socket_path()
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                self.wfile.write(encode(daemon.dispatch(self.rfile)))
+
+        # Create the socket file without group/other access.
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _Server(str(self.socket_path), Handler)
+        finally:
+            os.umask(old_umask)
+        self.backfill.start()
+        logger.info("Maestro daemon listening on %s (pid %s)", self.socket_path, os.getpid())
+        try:
+            self._server.serve_forever()
+        finally:
+            self.backfill.stop()
+            self._server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+            logger.info("Maestro daemon stopped")
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+    def dispatch(self, stream) -> Dict[str, Any]:
+        try:
+            request = read_message(stream)
+            if request is None:
+                return {"ok": False, "error": "Empty request"}
+            handler = self._handlers.get(request.get("method"))
+            if handler is None:
+                return {"ok": False, "error": f"Unknown method: {request.get('method')!r}"}
+            return {"ok": True, "result": handler(**(request.get("params") or {}))}
+        except (TypeError, ValueError) as exc:
+            return {"ok": False, "error": str(exc)}
+        except Exception as exc:  # report to the client instead of dropping the connection
+            logger.exception("Daemon request failed")
+            return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+
+    def _prepare_socket_path(self) -> None:
+        if self.socket_path.exists():
+            if DaemonClient(self.socket_path).ping():
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            # Left behind by a daemon that did not shut down cleanly.
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _ping(self) -> Dict[str, Any]:
+        return {"pid": os.getpid(), "uptime": time.time() - self.started_at, "search_cache": self.search.cache_stats()}
+
+    def _search(
+        self,
+        query: str,
+        mode: str = "semantic",
+        limit: int = 20,
+        filters: Dict[str, Any] | None = None,
+        cursor: str | None = None,
+        collapse: bool = False,
+    ) -> Dict[str, Any]:
+        page = self.search.search_page(
+            query, mode=mode, limit=limit, filters=filters_from_dict(filters), cursor=cursor, collapse=collapse
+        )
+        return page_to_dict(page)
+
+    def _recent(self, limit: int = 50, cursor: str | None = None) -> Dict[str, Any]:
+        return page_to_dict(self.search.list_page(limit=limit, cursor=cursor))
+
+    def _chat(self, history: list, top_k: int = 5) -> Dict[str, Any]:
+        return {"reply": self.chat.chat_with_emails(history, top_k=top_k)}
+
+    def _draft(self, instruction: str, related_query: str | None = None) -> Dict[str, Any]:
+        return {"draft": self.drafting.draft_email(instruction, related_query)}
+
+    def _sync_gmail(self, max_results: int = 200) -> Dict[str, Any]:
+        with self._sync_lock:
+            return {"imported": self.ingestion.sync_gmail(max_results=max_results)}
+
+    def _backfill_summaries(self, batch_size: int = 16) -> Dict[str, Any]:
+        return {"summarized": self.summaries.backfill(limit=batch_size)}
+
+    def _shutdown(self) -> Dict[str, Any]:
+        # shutdown() blocks until the serve loop exits; let this reply go out first.
+        threading.Thread(target=self.stop, name="daemon-shutdown", daemon=True).start()
+        return {"stopping": True}
@@ -0,0 +1,71 @@
+"""Structured metadata filters shared by the keyword and semantic search legs."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import ColumnElement
+
+from maestro.data.models import Email
+
+
+def to_local_naive(value: datetime | None) -> datetime | None:
+    """Convert aware datetimes to naive local time, matching how email dates are stored."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+def _contains(column, needle: str) -> ColumnElement[bool]:
+    """Case-insensitive literal substring match; ``%`` and ``_`` in the needle are not wildcards."""
+    escaped = needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.ilike(f"%{escaped}%", escape="\\")
+
+
+@dataclass(frozen=True)
+class EmailFilters:
+    """Restrict searches by date range, participants, thread or summary state.
+
+    ``from_address`` and ``to_address`` are case-insensitive substring matches
+    against the whole sender header and the whole To or Cc header
+    respectively; SQL and the in-memory ``FacetIndex`` apply the same rule.
+    """
+
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    from_address: Optional[str] = None
+    to_address: Optional[str] = None
+    thread_id: Optional[str] = None
+    has_summary: Optional[bool] = None
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "date_from", to_local_naive(self.date_from))
+        object.__setattr__(self, "date_to", to_local_naive(self.date_to))
+        if self.from_address is not None:
+            object.__setattr__(self, "from_address", self.from_address.strip().lower() or None)
+        if self.to_address is not None:
+            object.__setattr__(self, "to_address", self.to_address.strip().lower() or None)
+
+    def is_empty(self) -> bool:
+        return all(
+            value is None
+            for value in (self.date_from, self.date_to, self.from_address, self.to_address, self.thread_id, self.has_summary)
+        )
+
+    def clauses(self) -> List[ColumnElement[bool]]:
+        """Return SQL clauses equivalent to these filters."""
+        clauses: List[ColumnElement[bool]] = []
+        if self.date_from is not None:
+            clauses.append(Email.date >= self.date_from)
+        if self.date_to is not None:
+            clauses.append(Email.date <= self.date_to)
+        if self.from_address:
+            clauses.append(_contains(Email.from_address, self.from_address))
+        if self.to_address:
+            clauses.append(_contains(Email.to_addresses, self.to_address) | _contains(Email.cc_addresses, self.to_address))
+        if self.thread_id is not None:
+            clauses.append(Email.thread_id == self.thread_id)
+        if self.has_summary is not None:
+            clauses.append(Email.summary.is_not(None) if self.has_summary else Email.summary.is_(None))
+        return clauses
@@ -4,7 +4,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy import DateTime, Index, Integer, String, Text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -16,6 +16,8 @@ class Email(Base):
     """Email message stored locally."""
 
     __tablename__ = "emails"
+    # Serves date-ordered listings and keyset pagination on (date, id).
+    __table_args__ = (Index("ix_emails_date_id", "date", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     gmail_id: Mapped[str] = mapped_column(String(128), unique=True, index=True)
@@ -27,7 +29,10 @@ class Email(Base):
     subject: Mapped[str] = mapped_column(String(512))
     raw_html: Mapped[str] = mapped_column(Text)
     plain_text: Mapped[str] = mapped_column(Text)
+    new_content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Id of the cluster representative this email is a near-duplicate of.
+    duplicate_of: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
     date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,73 @@
+"""Opaque continuation tokens for paging through listings and search results."""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(token: str, kind: str) -> dict:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(payload, dict) or payload.get("k") != kind:
+        raise ValueError("Invalid cursor")
+    return payload
+
+
+def query_fingerprint(*parts: object) -> str:
+    """Short hash tying a continuation token to the query that produced it."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class KeysetCursor:
+    """Position after the last row of a page ordered by (date desc, id desc)."""
+
+    date: datetime
+    id: int
+
+    def encode(self) -> str:
+        return _encode({"k": "keyset", "d": self.date.isoformat(), "i": self.id})
+
+    @classmethod
+    def decode(cls, token: str) -> "KeysetCursor":
+        payload = _decode(token, "keyset")
+        try:
+            return cls(date=datetime.fromisoformat(payload["d"]), id=int(payload["i"]))
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+
+
+@dataclass(frozen=True)
+class ScoreCursor:
+    """Position after the last semantic hit, ordered by (distance asc, id asc).
+
+    ``seen`` is how many hits earlier pages returned and sizes the next
+    over-fetch; ``query`` is a fingerprint of the query and filters.
+    """
+
+    score: float
+    id: int
+    seen: int
+    query: str
+
+    def encode(self) -> str:
+        return _encode({"k": "score", "s": self.score, "i": self.id, "n": self.seen, "q": self.query})
+
+    @classmethod
+    def decode(cls, token: str) -> "ScoreCursor":
+        payload = _decode(token, "score")
+        try:
+            return cls(score=float(payload["s"]), id=int(payload["i"]), seen=int(payload["n"]), query=str(payload["q"]))
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
@@ -3,15 +3,26 @@ from __future__ import annotations
 
 import logging
 from abc import ABC, abstractmethod
-from typing import Iterable, List, Optional
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import ColumnElement, and_, create_engine, inspect, or_, select, text, update
+from sqlalchemy.orm import Session, defer, sessionmaker
 
 from maestro.core.config import settings
+from maestro.data.filters import EmailFilters
 from maestro.data.models import Base, Email
+from maestro.data.pagination import KeysetCursor
+from maestro.data.sqlite import SQLiteWriteQueue, apply_pragmas, create_read_only_engine, is_file_sqlite, production_pragmas
 
 logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+# (id, thread_id, from_address, to_addresses, cc_addresses, date, has_summary)
+FacetRow = Tuple[int, str, str, str, Optional[str], datetime, bool]
+
+# Stay well below SQLite's bound-parameter limit in ``IN (...)`` lookups.
+_IN_CHUNK = 500
 
 
 class EmailRepository(ABC):
@@ -30,52 +41,235 @@ class EmailRepository(ABC):
         """Retrieve an email by Gmail message id."""
 
     @abstractmethod
-    def search_by_keyword(self, query: str, limit: int = 20) -> List[Email]:
-        """Search for emails containing a keyword in subject or body."""
+    def get_emails(self, ids: Sequence[int]) -> List[Email]:
+        """Retrieve several emails by primary key, in the order given."""
+
+    @abstractmethod
+    def get_by_gmail_ids(self, gmail_ids: Sequence[str]) -> List[Email]:
+        """Retrieve several emails by Gmail message id, in the order given."""
+
+    @abstractmethod
+    def cluster_ids(self, ids: Sequence[int]) -> Dict[int, int]:
+        """Map each existing id to its near-duplicate cluster id (``duplicate_of`` or itself)."""
+
+    @abstractmethod
+    def search_by_keyword(
+        self,
+        query: str,
+        limit: int = 20,
+        filters: EmailFilters | None = None,
+        after: KeysetCursor | None = None,
+    ) -> List[Email]:
+        """Search for emails containing a keyword in subject or body, newest first."""
+
+    @abstractmethod
+    def list_recent(self, limit: int = 50, filters: EmailFilters | None = None, after: KeysetCursor | None = None) -> List[Email]:
+        """List recent emails by date, continuing after ``after`` when given."""
 
     @abstractmethod
-    def list_recent(self, limit: int = 50) -> List[Email]:
-        """List recent emails by date."""
+    def list_after_id(self, after_id: int, limit: int = 500) -> List[Email]:
+        """List emails with an id greater than ``after_id`` in ascending id order."""
+
+    @abstractmethod
+    def iter_emails(
+        self, filters: EmailFilters | None = None, batch_size: int = 500, include_html: bool = False
+    ) -> Iterator[Email]:
+        """Stream every matching email in id order without materializing the result."""
+
+    @abstractmethod
+    def filter_ids(self, filters: EmailFilters) -> List[int]:
+        """Return the ids of all emails matching the filters, in ascending order."""
+
+    @abstractmethod
+    def facet_rows(self) -> List[FacetRow]:
+        """Return the metadata needed to build a facet index for every email."""
+
+    @abstractmethod
+    def list_unsummarized(self, limit: int = 50) -> List[Email]:
+        """List recent emails that do not have a summary yet."""
+
+    @abstractmethod
+    def update_summaries(self, summaries: Mapping[int, str]) -> None:
+        """Store summaries keyed by email id."""
 
 
 class SqlAlchemyEmailRepository(EmailRepository):
-    """SQLite-backed repository using SQLAlchemy."""
+    """SQLite-backed repository using SQLAlchemy.
+
+    In ``production`` storage mode (file databases only) connections use WAL
+    and tuned pragmas, every write goes through a single writer thread that
+    batches concurrent writes into shared transactions, and reads use a pool
+    of read-only connections so they never wait on ingestion.
+    """
 
-    def __init__(self, database_url: str | None = None) -> None:
-        self.engine = create_engine(database_url or settings.database_url)
+    def __init__(self, database_url: str | None = None, storage_mode: str | None = None) -> None:
+        url = database_url or settings.database_url
+        self.production = (storage_mode or settings.storage_mode) == "production" and is_file_sqlite(url)
+        if self.production:
+            self.engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0)
+            apply_pragmas(self.engine, production_pragmas())
+        else:
+            self.engine = create_engine(url)
         Base.metadata.create_all(self.engine)
+        self._upgrade_schema()
         self.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.ReadSession = self.SessionLocal
+        self._writer: SQLiteWriteQueue | None = None
+        if self.production:
+            self.read_engine = create_read_only_engine(url, settings.sqlite_read_pool_size)
+            self.ReadSession = sessionmaker(bind=self.read_engine, expire_on_commit=False)
+            self._writer = SQLiteWriteQueue(self.SessionLocal)
+
+    def close(self) -> None:
+        """Flush pending writes and release connections."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self.read_engine.dispose()
+        self.engine.dispose()
+
+    def _write(self, op: Callable[[Session], T]) -> T:
+        if self._writer is not None:
+            return self._writer.write(op)
+        with self.SessionLocal() as session:
+            result = op(session)
+            session.commit()
+            return result
+
+    def _upgrade_schema(self) -> None:
+        """Add nullable columns and indexes introduced after a database was first created."""
+        existing = {column["name"] for column in inspect(self.engine).get_columns(Email.__tablename__)}
+        missing = [column for column in Email.__table__.columns if column.name not in existing and column.nullable]
+        with self.engine.begin() as conn:
+            for column in missing:
+                column_type = column.type.compile(dialect=self.engine.dialect)
+                conn.execute(text(f"ALTER TABLE {Email.__tablename__} ADD COLUMN {column.name} {column_type}"))
+                logger.info("Added column %s.%s", Email.__tablename__, column.name)
+        for index in Email.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
 
     def save_emails(self, emails: Iterable[Email]) -> None:
         email_list = list(emails)
-        with self.SessionLocal() as session:
+
+        def op(session: Session) -> None:
             for email in email_list:
                 session.merge(email)
-            session.commit()
-            logger.info("Saved %s emails", len(email_list))
+
+        self._write(op)
+        logger.info("Saved %s emails", len(email_list))
 
     def get_email(self, id: int) -> Optional[Email]:
-        with self.SessionLocal() as session:
+        with self.ReadSession() as session:
             return session.get(Email, id)
 
     def get_by_gmail_id(self, gmail_id: str) -> Optional[Email]:
-        with self.SessionLocal() as session:
+        with self.ReadSession() as session:
             stmt = select(Email).where(Email.gmail_id == gmail_id)
             return session.scalars(stmt).first()
 
-    def search_by_keyword(self, query: str, limit: int = 20) -> List[Email]:
+    def get_emails(self, ids: Sequence[int]) -> List[Email]:
+        if not ids:
+            return []
+        with self.ReadSession() as session:
+            by_id = {email.id: email for email in session.scalars(select(Email).where(Email.id.in_(ids)))}
+        return [by_id[id] for id in ids if id in by_id]
+
+    def get_by_gmail_ids(self, gmail_ids: Sequence[str]) -> List[Email]:
+        if not gmail_ids:
+            return []
+        with self.ReadSession() as session:
+            stmt = select(Email).where(Email.gmail_id.in_(gmail_ids))
+            by_gmail_id = {email.gmail_id: email for email in session.scalars(stmt)}
+        return [by_gmail_id[gmail_id] for gmail_id in gmail_ids if gmail_id in by_gmail_id]
+
+    def cluster_ids(self, ids: Sequence[int]) -> Dict[int, int]:
+        clusters: Dict[int, int] = {}
+        with self.ReadSession() as session:
+            for start in range(0, len(ids), _IN_CHUNK):
+                stmt = select(Email.id, Email.duplicate_of).where(Email.id.in_(ids[start : start + _IN_CHUNK]))
+                for id, duplicate_of in session.execute(stmt):
+                    clusters[id] = duplicate_of if duplicate_of is not None else id
+        return clusters
+
+    def search_by_keyword(
+        self,
+        query: str,
+        limit: int = 20,
+        filters: EmailFilters | None = None,
+        after: KeysetCursor | None = None,
+    ) -> List[Email]:
         pattern = f"%{query}%"
-        with self.SessionLocal() as session:
+        with self.ReadSession() as session:
             stmt = (
                 select(Email)
                 .where((Email.subject.ilike(pattern)) | (Email.plain_text.ilike(pattern)))
-                .order_by(Email.date.desc())
+                .where(*self._page_clauses(filters, after))
+                .order_by(Email.date.desc(), Email.id.desc())
                 .limit(limit)
             )
             return list(session.scalars(stmt))
 
-    def list_recent(self, limit: int = 50) -> List[Email]:
-        with self.SessionLocal() as session:
-            stmt = select(Email).order_by(Email.date.desc()).limit(limit)
+    def filter_ids(self, filters: EmailFilters) -> List[int]:
+        with self.ReadSession() as session:
+            stmt = select(Email.id).where(*filters.clauses()).order_by(Email.id)
+            return list(session.scalars(stmt))
+
+    def facet_rows(self) -> List[FacetRow]:
+        with self.ReadSession() as session:
+            stmt = select(
+                Email.id,
+                Email.thread_id,
+                Email.from_address,
+                Email.to_addresses,
+                Email.cc_addresses,
+                Email.date,
+                Email.summary.is_not(None),
+            )
+            return [tuple(row) for row in session.execute(stmt)]
+
+    def list_recent(self, limit: int = 50, filters: EmailFilters | None = None, after: KeysetCursor | None = None) -> List[Email]:
+        with self.ReadSession() as session:
+            stmt = (
+                select(Email)
+                .where(*self._page_clauses(filters, after))
+                .order_by(Email.date.desc(), Email.id.desc())
+                .limit(limit)
+            )
+            return list(session.scalars(stmt))
+
+    def list_after_id(self, after_id: int, limit: int = 500) -> List[Email]:
+        with self.ReadSession() as session:
+            stmt = (
+                select(Email).options(defer(Email.raw_html)).where(Email.id > after_id).order_by(Email.id).limit(limit)
+            )
+            return list(session.scalars(stmt))
+
+    def iter_emails(
+        self, filters: EmailFilters | None = None, batch_size: int = 500, include_html: bool = False
+    ) -> Iterator[Email]:
+        stmt = select(Email).where(*(filters.clauses() if filters else ())).order_by(Email.id)
+        if not include_html:
+            stmt = stmt.options(defer(Email.raw_html))
+        with self.ReadSession() as session:
+            # yield_per streams rows from the cursor; the weak identity map lets
+            # already-yielded objects be collected, so memory stays flat.
+            yield from session.scalars(stmt.execution_options(yield_per=batch_size))
+
+    @staticmethod
+    def _page_clauses(filters: EmailFilters | None, after: KeysetCursor | None) -> List[ColumnElement[bool]]:
+        clauses = filters.clauses() if filters else []
+        if after is not None:
+            clauses.append(or_(Email.date < after.date, and_(Email.date == after.date, Email.id < after.id)))
+        return clauses
+
+    def list_unsummarized(self, limit: int = 50) -> List[Email]:
+        with self.ReadSession() as session:
+            stmt = select(Email).where(Email.summary.is_(None)).order_by(Email.date.desc()).limit(limit)
             return list(session.scalars(stmt))
 
+    def update_summaries(self, summaries: Mapping[int, str]) -> None:
+        if not summaries:
+            return
+        rows = [{"id": id, "summary": summary} for id, summary in summaries.items()]
+        self._write(lambda session: session.execute(update(Email), rows))
+        logger.info("Stored %s summaries", len(summaries))
@@ -0,0 +1,152 @@
+"""SQLite tuning for concurrent use: pragmas, a single writer thread and read-only engines."""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, List, Mapping, Tuple, TypeVar
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+from maestro.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteOp = Callable[[Session], T]
+
+
+def production_pragmas() -> Mapping[str, object]:
+    """Pragmas applied to every connection in production storage mode."""
+    return {
+        "journal_mode": "WAL",
+        # WAL + NORMAL only risks the last transactions on power loss, never corruption.
+        "synchronous": "NORMAL",
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": -settings.sqlite_cache_size_kib,  # negative means KiB
+        "temp_store": "MEMORY",
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+    }
+
+
+def apply_pragmas(engine: Engine, pragmas: Mapping[str, object]) -> None:
+    """Run ``PRAGMA`` statements on every new DBAPI connection of ``engine``."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def is_file_sqlite(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def create_read_only_engine(database_url: str, pool_size: int) -> Engine:
+    """Pooled engine whose connections open the database file read-only."""
+    path = Path(make_url(database_url).database).resolve()
+    engine = create_engine(
+        f"sqlite:///file:{path}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_pre_ping=False,
+    )
+    pragmas = dict(production_pragmas())
+    pragmas.pop("journal_mode")  # a read-only connection cannot change the journal mode
+    pragmas["query_only"] = "ON"
+    apply_pragmas(engine, pragmas)
+    return engine
+
+
+class SQLiteWriteQueue:
+    """Single writer thread that batches queued write operations into shared transactions.
+
+    Producers submit ``fn(session)`` callables and wait on the returned future.
+    The writer drains whatever has queued up (up to ``max_batch``) and commits it
+    in one transaction. If the batch fails, each operation is retried on its own
+    so only the failing one reports an error.
+    """
+
+    def __init__(self, session_factory: sessionmaker, max_batch: int | None = None, linger_ms: float | None = None) -> None:
+        self.session_factory = session_factory
+        self.max_batch = max_batch or settings.sqlite_write_batch
+        self.linger = (linger_ms if linger_ms is not None else settings.sqlite_write_linger_ms) / 1000
+        self._queue: "queue.Queue[Tuple[WriteOp, Future] | None]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op: WriteOp) -> "Future[T]":
+        future: Future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def write(self, op: WriteOp) -> T:
+        """Queue ``op`` and block until its transaction has committed."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Nested writes from inside a write operation would deadlock")
+        return self.submit(op).result()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._execute(batch)
+                    return
+                batch.append(item)
+            self._execute(batch)
+
+    def _execute(self, batch: List[Tuple[WriteOp, Future]]) -> None:
+        batch = [(op, future) for op, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        try:
+            with self.session_factory() as session:
+                for op, _ in batch:
+                    results.append(op(session))
+                session.commit()
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            logger.warning("Batched write of %s operations failed; retrying individually", len(batch))
+            for op, future in batch:
+                self._execute_one(op, future)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _execute_one(self, op: WriteOp, future: Future) -> None:
+        try:
+            with self.session_factory() as session:
+                result = op(session)
+                session.commit()
+        except Exception as exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
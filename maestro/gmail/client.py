@@ -6,6 +6,7 @@ import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
 from typing import List
 
 from google.auth.transport.requests import Request
@@ -46,22 +47,23 @@ class GmailClient(ABC):
 class GoogleGmailClient(GmailClient):
     """Implementation backed by Google Gmail API."""
 
-    def __init__(self) -> None:
+    def __init__(self, token_path: Path | None = None) -> None:
+        self.token_path = Path(token_path or settings.gmail_token_path)
         self.creds = self._load_credentials()
         self.service = build("gmail", "v1", credentials=self.creds)
 
     def _load_credentials(self) -> Credentials:
         creds: Credentials | None = None
-        if settings.gmail_token_path.exists():
-            creds = Credentials.from_authorized_user_file(str(settings.gmail_token_path), SCOPES)
+        if self.token_path.exists():
+            creds = Credentials.from_authorized_user_file(str(self.token_path), SCOPES)
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
                 flow = InstalledAppFlow.from_client_secrets_file(str(settings.gmail_credentials_path), SCOPES)
                 creds = flow.run_local_server(port=0)
-            settings.gmail_token_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(settings.gmail_token_path, "w", encoding="utf-8") as token:
+            self.token_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.token_path, "w", encoding="utf-8") as token:
                 token.write(creds.to_json())
         return creds
 
@@ -99,7 +101,9 @@ class GoogleGmailClient(GmailClient):
         return fetched
 
     @staticmethod
-    def to_email(raw: RawGmailEmail, plain_text: str, summary: str | None = None) -> Email:
+    def to_email(
+        raw: RawGmailEmail, plain_text: str, summary: str | None = None, new_content: str | None = None
+    ) -> Email:
         """Convert RawGmailEmail to domain Email."""
 
         return Email(
@@ -112,6 +116,7 @@ class GoogleGmailClient(GmailClient):
             subject=raw.subject,
             raw_html=raw.raw_html,
             plain_text=plain_text,
+            new_content=new_content,
             summary=summary,
             date=raw.date,
         )
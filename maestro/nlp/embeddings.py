@@ -2,9 +2,11 @@
 from __future__ import annotations
 
 import logging
+import os
+import threading
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import faiss  # type: ignore
 import numpy as np
@@ -23,19 +25,47 @@ class EmbeddingModel(ABC):
     def embed_texts(self, texts: List[str]) -> np.ndarray:
         """Return embeddings for the provided texts."""
 
+    def embed_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Embed a large batch; implementations may use bigger batches or several workers."""
+        return self.embed_texts(texts)
+
+    def start_workers(self, workers: int) -> None:
+        """Prepare ``workers`` parallel workers for ``embed_batch``; a no-op by default."""
+
+    def stop_workers(self) -> None:
+        """Release workers started by ``start_workers``."""
+
 
 class HFEmbeddingModel(EmbeddingModel):
     """SentenceTransformers-based embedding model."""
 
     def __init__(self, model_name: str | None = None, device: str | None = None) -> None:
-        name = model_name or settings.embedding_model_name
+        self.model_name = model_name or settings.embedding_model_name
         self.device = device or settings.device
-        self.model = SentenceTransformer(name, device=self.device)
+        self.model = SentenceTransformer(self.model_name, device=self.device)
+        self._pool: dict | None = None
 
     def embed_texts(self, texts: List[str]) -> np.ndarray:
         embeddings = self.model.encode(texts, convert_to_numpy=True, device=self.device, batch_size=8)
         return embeddings.astype("float32")
 
+    def embed_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        if self._pool is not None:
+            embeddings = self.model.encode_multi_process(texts, self._pool, batch_size=batch_size)
+        else:
+            embeddings = self.model.encode(texts, convert_to_numpy=True, device=self.device, batch_size=batch_size)
+        return np.asarray(embeddings, dtype="float32")
+
+    def start_workers(self, workers: int) -> None:
+        """Spread ``embed_batch`` over several CPU processes (no-op on CUDA or for one worker)."""
+        if workers > 1 and self.device != "cuda" and self._pool is None:
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * workers)
+
+    def stop_workers(self) -> None:
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
 
 class EmbeddingIndex(ABC):
     """Abstract vector index."""
@@ -45,22 +75,44 @@ class EmbeddingIndex(ABC):
         """Add vectors to the index."""
 
     @abstractmethod
-    def search(self, query_vector: np.ndarray, k: int = 10) -> List[Tuple[int, float]]:
-        """Return (id, score) pairs for nearest vectors."""
+    def search(
+        self, query_vector: np.ndarray, k: int = 10, allowed_ids: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """Return (id, score) pairs for nearest vectors, restricted to ``allowed_ids`` when given."""
 
     @abstractmethod
     def persist(self) -> None:
         """Persist index to disk."""
 
+    def vectors_for(self, ids: List[int]) -> Dict[int, np.ndarray]:
+        """Stored vectors for whichever of ``ids`` are present; empty if unsupported."""
+        return {}
 
-class FaissEmbeddingIndex(EmbeddingIndex):
-    """FAISS-backed index with optional GPU acceleration."""
 
-    def __init__(self, dim: int, index_path: Path | None = None, use_gpu: bool = torch.cuda.is_available()) -> None:
+class FaissEmbeddingIndex(EmbeddingIndex):
+    """FAISS-backed index with optional GPU acceleration.
+
+    Filtered searches over a small candidate set score just those vectors;
+    larger sets are pushed into FAISS as a bitmap ``IDSelector``. Writes are
+    serialized by ``write_lock`` and the index file is replaced atomically.
+    """
+
+    # Below this many candidates, reconstructing and scoring them directly beats a full scan.
+    DIRECT_SCORE_LIMIT = 4096
+
+    def __init__(
+        self,
+        dim: int,
+        index_path: Path | None = None,
+        use_gpu: bool = torch.cuda.is_available(),
+        autosave: bool = True,
+    ) -> None:
         self.dim = dim
         self.index_path = Path(index_path or settings.faiss_index_path)
         self.use_gpu = use_gpu
-        self.index = faiss.IndexFlatL2(dim)
+        self.autosave = autosave
+        self.write_lock = threading.RLock()
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
         if self.use_gpu:
             res = faiss.StandardGpuResources()
             self.index = faiss.index_cpu_to_gpu(res, 0, self.index)
@@ -70,12 +122,60 @@ class FaissEmbeddingIndex(EmbeddingIndex):
     def add_items(self, ids: List[int], vectors: np.ndarray) -> None:
         if len(ids) != vectors.shape[0]:
             raise ValueError("ids and vectors length mismatch")
-        self.index.add_with_ids(vectors, np.array(ids, dtype="int64"))
-        logger.info("Added %s vectors to index", len(ids))
-        self.persist()
-
-    def search(self, query_vector: np.ndarray, k: int = 10) -> List[Tuple[int, float]]:
-        distances, indices = self.index.search(query_vector.astype("float32"), k)
+        with self.write_lock:
+            self.index.add_with_ids(vectors, np.array(ids, dtype="int64"))
+            logger.info("Added %s vectors to index", len(ids))
+            if self.autosave:
+                self.persist()
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def vectors_for(self, ids: List[int]) -> Dict[int, np.ndarray]:
+        present, vectors = self._reconstruct(self.index, ids)
+        return dict(zip(present, vectors))
+
+    def remove_ids_from(self, first_id: int) -> None:
+        """Drop every vector whose id is ``first_id`` or higher."""
+        with self.write_lock:
+            self.index.remove_ids(faiss.IDSelectorRange(first_id, np.iinfo("int64").max))
+
+    def swap_in(self, other: "FaissEmbeddingIndex") -> None:
+        """Replace this index, on disk and in memory, with a fully built one.
+
+        The file is moved into place with an atomic rename, and searches that
+        are already running finish against the previous in-memory index.
+        """
+        with self.write_lock:
+            other.persist()
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(other.index_path, self.index_path)
+            cpu_index = faiss.index_gpu_to_cpu(other.index) if other.use_gpu else other.index
+            if self.use_gpu:
+                cpu_index = faiss.index_cpu_to_gpu(faiss.StandardGpuResources(), 0, cpu_index)
+            self.dim = other.dim
+            self.index = cpu_index
+        logger.info("Swapped in rebuilt index with %s vectors", len(self))
+
+    def search(
+        self, query_vector: np.ndarray, k: int = 10, allowed_ids: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        query_vector = query_vector.astype("float32")
+        index = self.index  # a concurrent swap_in must not change the index mid-search
+        if allowed_ids is None:
+            distances, indices = index.search(query_vector, k)
+        elif not len(allowed_ids):
+            return []
+        elif len(allowed_ids) <= self.DIRECT_SCORE_LIMIT and not self.use_gpu:
+            return self._score_directly(index, query_vector, allowed_ids, k)
+        elif self.use_gpu:
+            # GPU indexes ignore IDSelectors in search params, so filter after the search.
+            return self._search_post_filtered(index, query_vector, allowed_ids, k)
+        else:
+            # Keep the packed bitmap referenced until the search returns.
+            bitmap = np.packbits(np.bincount(allowed_ids, minlength=int(allowed_ids.max()) + 1) > 0, bitorder="little")
+            selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+            distances, indices = index.search(query_vector, k, params=faiss.SearchParameters(sel=selector))
         results: List[Tuple[int, float]] = []
         for idx, dist in zip(indices[0], distances[0]):
             if idx == -1:
@@ -83,12 +183,56 @@ class FaissEmbeddingIndex(EmbeddingIndex):
             results.append((int(idx), float(dist)))
         return results
 
+    @classmethod
+    def _score_directly(cls, index, query_vector: np.ndarray, allowed_ids: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        present, vectors = cls._reconstruct(index, allowed_ids.tolist())
+        if not present:
+            return []
+        distances = ((vectors - query_vector[0]) ** 2).sum(axis=1)
+        order = np.argsort(distances)[:k]
+        return [(present[i], float(distances[i])) for i in order]
+
+    @staticmethod
+    def _reconstruct(index, ids: List[int]) -> Tuple[List[int], np.ndarray]:
+        """Vectors for ``ids`` in one call, skipping ids that were never embedded."""
+        if not ids:
+            return [], np.empty((0, index.d), dtype="float32")
+        try:
+            return list(ids), index.reconstruct_batch(np.asarray(ids, dtype="int64"))
+        except RuntimeError:
+            # Some ids are filtered in by metadata but not embedded yet; find them one by one.
+            present: List[int] = []
+            vectors: List[np.ndarray] = []
+            for id in ids:
+                try:
+                    vectors.append(index.reconstruct(id))
+                except RuntimeError:
+                    continue
+                present.append(id)
+            return present, (np.vstack(vectors) if vectors else np.empty((0, index.d), dtype="float32"))
+
+    @staticmethod
+    def _search_post_filtered(index, query_vector: np.ndarray, allowed_ids: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if not index.ntotal:
+            return []
+        fetch = k * 4
+        while True:
+            fetch = min(fetch, index.ntotal)
+            distances, indices = index.search(query_vector, fetch)
+            keep = (indices[0] != -1) & np.isin(indices[0], allowed_ids)
+            hits = [(int(idx), float(dist)) for idx, dist in zip(indices[0][keep], distances[0][keep])]
+            if len(hits) >= k or fetch >= index.ntotal:
+                return hits[:k]
+            fetch *= 4
+
     def persist(self) -> None:
         cpu_index = self.index
         if self.use_gpu:
             cpu_index = faiss.index_gpu_to_cpu(self.index)
         self.index_path.parent.mkdir(parents=True, exist_ok=True)
-        faiss.write_index(cpu_index, str(self.index_path))
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        faiss.write_index(cpu_index, str(tmp_path))
+        os.replace(tmp_path, self.index_path)
 
     def _load(self) -> None:
         logger.info("Loading FAISS index from %s", self.index_path)
@@ -3,12 +3,15 @@ from __future__ import annotations
 
 import logging
 import re
+import threading
 from collections import defaultdict
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 
+from maestro.data.filters import EmailFilters, to_local_naive
 from maestro.data.models import Email
+from maestro.data.repository import FacetRow
 from maestro.nlp.embeddings import EmbeddingIndex, EmbeddingModel
 
 logger = logging.getLogger(__name__)
@@ -27,6 +30,11 @@ class WordIndex:
                 self.index[token].add(email.id)
         logger.info("Keyword index built for %s terms", len(self.index))
 
+    def replace_with(self, other: "WordIndex") -> None:
+        """Adopt a freshly built index in one assignment so readers never see a partial one."""
+        self.index = other.index
+        logger.info("Keyword index replaced (%s terms)", len(self.index))
+
     def search(self, query: str, limit: int = 20) -> List[int]:
         tokens = self._tokenize(query)
         results: set[int] = set()
@@ -39,19 +47,172 @@ class WordIndex:
         return [t.lower() for t in re.findall(r"\b\w+\b", text)]
 
 
+class FacetIndex:
+    """In-memory per-facet id arrays used to resolve metadata filters without SQL.
+
+    Each thread, sender and recipient maps to a list of email ids; dates are
+    kept as a sorted array so ranges resolve with a binary search. Frozen numpy
+    views are rebuilt lazily after new emails arrive.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._threads: Dict[str, List[int]] = defaultdict(list)
+        self._senders: Dict[str, List[int]] = defaultdict(list)
+        self._recipients: Dict[str, List[int]] = defaultdict(list)
+        self._dated: List[Tuple[float, int]] = []
+        self._summarized: set[int] = set()
+        self._all: set[int] = set()
+        self._frozen: Dict[Tuple[str, str], np.ndarray] = {}
+        self._date_keys = np.empty(0, dtype="float64")
+        self._date_ids = np.empty(0, dtype="int64")
+        self._dates_dirty = False
+
+    def build(self, rows: Iterable[FacetRow]) -> None:
+        self.add_rows(rows)
+        logger.info("Facet index built for %s emails", len(self._all))
+
+    def add(self, emails: Iterable[Email]) -> None:
+        self.add_rows(
+            (email.id, email.thread_id, email.from_address, email.to_addresses, email.cc_addresses, email.date, email.summary is not None)
+            for email in emails
+        )
+
+    def add_rows(self, rows: Iterable[FacetRow]) -> None:
+        with self._lock:
+            for id, thread_id, from_address, to_addresses, cc_addresses, date, has_summary in rows:
+                if id in self._all:
+                    continue
+                self._all.add(id)
+                self._threads[thread_id].append(id)
+                self._senders[(from_address or "").lower()].append(id)
+                # Keyed by whole header, matching the SQL substring filter on To/Cc.
+                for header in {field.lower() for field in (to_addresses, cc_addresses) if field}:
+                    self._recipients[header].append(id)
+                self._dated.append((to_local_naive(date).timestamp(), id))
+                if has_summary:
+                    self._summarized.add(id)
+            self._frozen.clear()
+            self._dates_dirty = True
+
+    def mark_summarized(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            self._summarized.update(ids)
+            self._frozen.pop(("summary", ""), None)
+
+    def candidates(self, filters: EmailFilters) -> Optional[np.ndarray]:
+        """Return sorted ids matching the filters, or None when nothing is filtered."""
+        if filters.is_empty():
+            return None
+        with self._lock:
+            sets: List[np.ndarray] = []
+            if filters.thread_id is not None:
+                sets.append(self._frozen_ids("thread", filters.thread_id, lambda: self._threads.get(filters.thread_id, [])))
+            if filters.from_address:
+                sets.append(self._frozen_ids("from", filters.from_address, lambda: self._matching(self._senders, filters.from_address)))
+            if filters.to_address:
+                sets.append(self._frozen_ids("to", filters.to_address, lambda: self._matching(self._recipients, filters.to_address)))
+            if filters.date_from is not None or filters.date_to is not None:
+                sets.append(self._date_range(filters))
+            if filters.has_summary is not None:
+                summarized = self._frozen_ids("summary", "", lambda: self._summarized)
+                if not filters.has_summary:
+                    summarized = np.setdiff1d(self._frozen_ids("all", "", lambda: self._all), summarized, assume_unique=True)
+                sets.append(summarized)
+        sets.sort(key=len)
+        result = sets[0]
+        for other in sets[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def _frozen_ids(self, facet: str, key: str, source) -> np.ndarray:
+        cached = self._frozen.get((facet, key))
+        if cached is None:
+            cached = np.unique(np.fromiter(source(), dtype="int64"))
+            self._frozen[(facet, key)] = cached
+        return cached
+
+    def _date_range(self, filters: EmailFilters) -> np.ndarray:
+        if self._dates_dirty:
+            self._dated.sort()
+            self._date_keys = np.fromiter((ts for ts, _ in self._dated), dtype="float64", count=len(self._dated))
+            self._date_ids = np.fromiter((id for _, id in self._dated), dtype="int64", count=len(self._dated))
+            self._dates_dirty = False
+        lo = 0 if filters.date_from is None else np.searchsorted(self._date_keys, filters.date_from.timestamp(), side="left")
+        hi = len(self._date_keys) if filters.date_to is None else np.searchsorted(self._date_keys, filters.date_to.timestamp(), side="right")
+        return np.sort(self._date_ids[lo:hi])
+
+    @staticmethod
+    def _matching(facet: Dict[str, List[int]], needle: str) -> Iterable[int]:
+        for key, ids in facet.items():
+            if needle in key:
+                yield from ids
+
+
+
+class IndexGeneration:
+    """Monotonic counter bumped whenever stored emails or their indexes change."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+def add_vectors(embedding_index: EmbeddingIndex, emails: List[Email], embed: Callable[[List[str]], np.ndarray]) -> int:
+    """Add vectors for ``emails``, copying a near-duplicate's from its representative.
+
+    Representatives are embedded first so duplicates in the same batch can
+    reuse them. Returns the number of texts that went through the model.
+    """
+    representatives = [email for email in emails if email.duplicate_of is None]
+    duplicates = [email for email in emails if email.duplicate_of is not None]
+    if representatives:
+        vectors = embed([email.new_content or email.plain_text for email in representatives])
+        embedding_index.add_items([email.id for email in representatives], vectors)
+    if not duplicates:
+        return len(representatives)
+    reused = embedding_index.vectors_for(sorted({email.duplicate_of for email in duplicates}))
+    copied = [email for email in duplicates if email.duplicate_of in reused]
+    if copied:
+        embedding_index.add_items([email.id for email in copied], np.vstack([reused[email.duplicate_of] for email in copied]))
+    # A representative that was never embedded leaves its duplicates to the model.
+    orphans = [email for email in duplicates if email.duplicate_of not in reused]
+    if orphans:
+        embedding_index.add_items([email.id for email in orphans], embed([email.new_content or email.plain_text for email in orphans]))
+    return len(representatives) + len(orphans)
+
+
 class IndexCoordinator:
     """Coordinates semantic and keyword index updates."""
 
-    def __init__(self, embedding_model: EmbeddingModel, embedding_index: EmbeddingIndex, word_index: WordIndex) -> None:
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel,
+        embedding_index: EmbeddingIndex,
+        word_index: WordIndex,
+        facet_index: FacetIndex | None = None,
+    ) -> None:
         self.embedding_model = embedding_model
         self.embedding_index = embedding_index
         self.word_index = word_index
+        self.facet_index = facet_index
 
     def index_emails(self, emails: List[Email]) -> None:
         if not emails:
             return
-        vectors = self.embedding_model.embed_texts([email.plain_text for email in emails])
-        ids = [email.id for email in emails]
-        self.embedding_index.add_items(ids, vectors)
+        add_vectors(self.embedding_index, emails, self.embedding_model.embed_texts)
         self.word_index.build(emails)
+        if self.facet_index is not None:
+            self.facet_index.add(emails)
 
@@ -1,14 +1,22 @@
 """Local LLM utilities for chat and drafting."""
 from __future__ import annotations
 
+import logging
 from abc import ABC, abstractmethod
-from typing import List
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence
 
-from transformers import pipeline
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteria, StoppingCriteriaList, pipeline
 
 from maestro.core.config import settings
 from maestro.data.models import Email
 
+logger = logging.getLogger(__name__)
+
+# Candidate length used when prompt lookup stands in for an unusable assistant model.
+_DEFAULT_PROMPT_LOOKUP_TOKENS = 10
+
 
 class LLMClient(ABC):
     """Abstract interface for conversational and generation abilities."""
@@ -22,33 +30,131 @@ class LLMClient(ABC):
         """Generate an email draft using provided instruction and context."""
 
 
+@dataclass
+class Completion:
+    """Text generated for one prompt and the number of new tokens it took."""
+
+    text: str
+    new_tokens: int
+
+
+class _StopRows(StoppingCriteria):
+    """Per-row stopping criterion so one cancelled request can leave a shared batch."""
+
+    def __init__(self, should_stop: Sequence[Callable[[], bool]]) -> None:
+        self.should_stop = should_stop
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        return torch.tensor([stop() for stop in self.should_stop], dtype=torch.bool, device=input_ids.device)
+
+
 class HFCausalLLM(LLMClient):
-    """Hugging Face causal LM wrapper using local models."""
+    """Hugging Face causal LM wrapper using local models.
 
-    def __init__(self, model_name: str | None = None, device: str | None = None) -> None:
+    Single-prompt generation can be sped up with speculative decoding: a small
+    ``assistant_model`` sharing the main model's tokenizer drafts tokens that
+    the large model verifies in one forward pass, or, without an assistant,
+    ``prompt_lookup_tokens`` drafts candidates by matching n-grams already in
+    the prompt (drafts quote retrieved emails heavily). Batched calls fall
+    back to plain decoding, which Hugging Face requires for assisted generation.
+    """
+
+    def __init__(
+        self,
+        model_name: str | None = None,
+        device: str | None = None,
+        assistant_model_name: str | None = None,
+        prompt_lookup_tokens: int | None = None,
+    ) -> None:
         self.model_name = model_name or settings.llm_model_name
         device_name = device or settings.device
         self.device = 0 if device_name == "cuda" else -1
         self.generator = pipeline("text-generation", model=self.model_name, device=self.device)
+        self.tokenizer = self.generator.tokenizer
+        # Decoder-only models must be left-padded for batched generation.
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.prompt_lookup_tokens = prompt_lookup_tokens if prompt_lookup_tokens is not None else settings.llm_prompt_lookup_tokens
+        assistant_name = assistant_model_name if assistant_model_name is not None else settings.llm_assistant_model_name
+        self.assistant_model = self._load_assistant(assistant_name) if assistant_name else None
+
+    @property
+    def speculative_mode(self) -> str:
+        if self.assistant_model is not None:
+            return "assistant"
+        if self.prompt_lookup_tokens > 0:
+            return "prompt_lookup"
+        return "off"
 
     def chat(self, system_prompt: str, messages: List[dict]) -> str:
-        prompt = self._build_chat_prompt(system_prompt, messages)
-        response = self.generator(prompt, max_new_tokens=256, do_sample=True, temperature=0.7)
-        return response[0]["generated_text"][len(prompt) :].strip()
+        return self.complete([self.build_chat_prompt(system_prompt, messages)])[0].text
 
     def generate_email_draft(self, instruction: str, context_emails: List[Email]) -> str:
+        return self.complete([self.build_draft_prompt(instruction, context_emails)])[0].text
+
+    def count_tokens(self, prompt: str) -> int:
+        return len(self.tokenizer(prompt, add_special_tokens=True)["input_ids"])
+
+    def complete(
+        self,
+        prompts: List[str],
+        max_new_tokens: int = 256,
+        temperature: float = 0.7,
+        should_stop: Sequence[Callable[[], bool]] | None = None,
+    ) -> List[Completion]:
+        """Generate continuations for several prompts in one padded forward pass per step."""
+        model = self.generator.model
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+        stopping = StoppingCriteriaList([_StopRows(should_stop)]) if should_stop else None
+        with torch.inference_mode():
+            output = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=True,
+                temperature=temperature,
+                pad_token_id=self.tokenizer.pad_token_id,
+                stopping_criteria=stopping,
+                **self._speculative_kwargs(len(prompts)),
+            )
+        new_tokens = output[:, inputs["input_ids"].shape[1] :]
+        texts = self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+        counts = (new_tokens != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+        return [Completion(text.strip(), int(count)) for text, count in zip(texts, counts)]
+
+    def _speculative_kwargs(self, batch_size: int) -> Dict[str, Any]:
+        if batch_size != 1:
+            return {}
+        if self.assistant_model is not None:
+            return {"assistant_model": self.assistant_model}
+        if self.prompt_lookup_tokens > 0:
+            return {"prompt_lookup_num_tokens": self.prompt_lookup_tokens}
+        return {}
+
+    def _load_assistant(self, name: str):
+        """Load the draft model, or fall back to prompt lookup if its vocabulary differs."""
+        assistant_tokenizer = AutoTokenizer.from_pretrained(name)
+        if assistant_tokenizer.get_vocab() != self.tokenizer.get_vocab():
+            logger.warning("Assistant model %s does not share the tokenizer of %s; using prompt lookup", name, self.model_name)
+            self.prompt_lookup_tokens = self.prompt_lookup_tokens or _DEFAULT_PROMPT_LOOKUP_TOKENS
+            return None
+        model = self.generator.model
+        assistant = AutoModelForCausalLM.from_pretrained(name, torch_dtype=model.dtype).to(model.device)
+        assistant.eval()
+        logger.info("Using %s as assistant model for speculative decoding", name)
+        return assistant
+
+    def build_draft_prompt(self, instruction: str, context_emails: List[Email]) -> str:
         context = "\n\n".join(
             f"From: {email.from_address}\nSubject: {email.subject}\nSummary: {email.summary or email.plain_text[:280]}"
             for email in context_emails
         )
-        prompt = (
+        return (
             f"You are Maestro, an email drafting assistant. Use the context below to craft a helpful response.\n"
             f"Context:\n{context}\n\nInstruction: {instruction}\nDraft:"
         )
-        response = self.generator(prompt, max_new_tokens=256, do_sample=True, temperature=0.7)
-        return response[0]["generated_text"][len(prompt) :].strip()
 
-    def _build_chat_prompt(self, system_prompt: str, messages: List[dict]) -> str:
+    def build_chat_prompt(self, system_prompt: str, messages: List[dict]) -> str:
         serialized = system_prompt + "\n"
         for msg in messages:
             role = msg.get("role", "user")
@@ -56,4 +162,3 @@ class HFCausalLLM(LLMClient):
             serialized += f"{role}: {content}\n"
         serialized += "assistant:"
         return serialized
-
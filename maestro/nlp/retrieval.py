@@ -1,21 +1,26 @@
 """Retrieval helpers combining semantic search with storage."""
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
+
+import numpy as np
 
 from maestro.data.models import Email
 from maestro.data.repository import EmailRepository
 from maestro.nlp.embeddings import EmbeddingIndex, EmbeddingModel
 
 
-def semantic_retrieve(query: str, repo: EmailRepository, model: EmbeddingModel, index: EmbeddingIndex, k: int = 5) -> List[Email]:
-    """Retrieve top-k emails using semantic similarity."""
+def semantic_retrieve(
+    query: str,
+    repo: EmailRepository,
+    model: EmbeddingModel,
+    index: EmbeddingIndex,
+    k: int = 5,
+    allowed_ids: Optional[np.ndarray] = None,
+) -> List[Email]:
+    """Retrieve top-k emails using semantic similarity, optionally restricted to ``allowed_ids``."""
+    if allowed_ids is not None and not len(allowed_ids):
+        return []
     query_vec = model.embed_texts([query])
-    results = index.search(query_vec, k=k)
-    emails: List[Email] = []
-    for email_id, _score in results:
-        email = repo.get_email(email_id)
-        if email:
-            emails.append(email)
-    return emails
-
+    results = index.search(query_vec, k=k, allowed_ids=allowed_ids)
+    return repo.get_emails([email_id for email_id, _score in results])
@@ -0,0 +1,263 @@
+"""Batching, prioritized scheduler in front of the local LLM."""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from maestro.core.config import settings
+from maestro.data.models import Email
+from maestro.nlp.llm import HFCausalLLM, LLMClient
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CHAT = 0
+PRIORITY_DRAFT = 1
+
+_current_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("generation_request_id", default=None)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the generation queue is at its configured depth."""
+
+
+@contextlib.contextmanager
+def generation_request(request_id: Optional[str]) -> Iterator[None]:
+    """Tag generations started in this context so they can be cancelled by id."""
+    token = _current_request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _current_request_id.reset(token)
+
+
+@dataclass
+class GenerationTicket:
+    """Handle for a queued generation."""
+
+    prompt: str
+    priority: int
+    seq: int
+    prompt_tokens: int
+    max_new_tokens: int
+    temperature: float
+    request_id: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    future: Future = field(default_factory=Future)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+    def cancel(self) -> None:
+        """Drop the request if queued, or stop its row at the next decoding step if running."""
+        self.cancelled.set()
+        self.future.cancel()
+
+    def result(self, timeout: float | None = None) -> str:
+        try:
+            return self.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.cancel()
+            raise TimeoutError("Generation timed out") from None
+
+
+class GenerationScheduler:
+    """Queue generations, batch compatible ones and run them on one worker thread.
+
+    Requests with the same decoding parameters share a padded forward pass.
+    Batches are seeded with the most urgent request (chat before drafting,
+    FIFO within a priority; drafts waiting longer than ``starvation_seconds``
+    are promoted) and filled with requests whose prompt lengths keep padding
+    under ``max_padding_ratio``. The queue is bounded, and cancelled requests
+    leave their batch at the next decoding step.
+    """
+
+    def __init__(
+        self,
+        llm: HFCausalLLM,
+        max_batch_size: int | None = None,
+        batch_window_ms: float | None = None,
+        max_queue: int | None = None,
+        max_padding_ratio: float | None = None,
+        starvation_seconds: float | None = None,
+    ) -> None:
+        self.llm = llm
+        self.max_batch_size = max_batch_size or settings.llm_max_batch_size
+        self.batch_window = (batch_window_ms if batch_window_ms is not None else settings.llm_batch_window_ms) / 1000
+        self.max_queue = max_queue or settings.llm_max_queue
+        self.max_padding_ratio = max_padding_ratio if max_padding_ratio is not None else settings.llm_max_padding_ratio
+        self.starvation_seconds = starvation_seconds if starvation_seconds is not None else settings.llm_starvation_seconds
+        self._pending: List[GenerationTicket] = []
+        self._by_request_id: Dict[str, GenerationTicket] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._stopped = False
+        self.completed = 0
+        self.generated_tokens = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="llm-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        prompt: str,
+        priority: int = PRIORITY_CHAT,
+        max_new_tokens: int = 256,
+        temperature: float = 0.7,
+        request_id: Optional[str] = None,
+    ) -> GenerationTicket:
+        ticket = GenerationTicket(
+            prompt=prompt,
+            priority=priority,
+            seq=next(self._seq),
+            prompt_tokens=self.llm.count_tokens(prompt),
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            request_id=request_id if request_id is not None else _current_request_id.get(),
+        )
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Scheduler is stopped")
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError(f"Generation queue is full ({self.max_queue} pending)")
+            self._pending.append(ticket)
+            if ticket.request_id:
+                self._by_request_id[ticket.request_id] = ticket
+            self._cond.notify()
+        return ticket
+
+    def cancel(self, request_id: str) -> bool:
+        with self._cond:
+            ticket = self._by_request_id.get(request_id)
+        if ticket is None:
+            return False
+        ticket.cancel()
+        return True
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            for ticket in self._pending:
+                ticket.cancel()
+            self._pending.clear()
+            self._cond.notify_all()
+        self._thread.join()
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = len(self._pending)
+        return {
+            "queued": queued,
+            "completed": self.completed,
+            "batches": self.batches,
+            "avg_batch_size": self.completed / self.batches if self.batches else 0.0,
+            "generated_tokens": self.generated_tokens,
+            "tokens_per_second": self.generated_tokens / self.busy_seconds if self.busy_seconds else 0.0,
+        }
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if batch:
+                self._execute(batch)
+
+    def _next_batch(self) -> Optional[List[GenerationTicket]]:
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return None
+            # Give concurrent callers a moment to join this batch.
+            if len(self._pending) < self.max_batch_size and self.batch_window > 0:
+                self._cond.wait(self.batch_window)
+            for ticket in self._pending:
+                if ticket.cancelled.is_set():
+                    self._forget(ticket)
+            self._pending = [ticket for ticket in self._pending if not ticket.cancelled.is_set()]
+            if not self._pending:
+                return []
+            now = time.monotonic()
+            ordered = sorted(self._pending, key=lambda ticket: self._urgency(ticket, now))
+            seed = ordered[0]
+            batch = [seed]
+            longest = total = seed.prompt_tokens
+            for ticket in ordered[1:]:
+                if len(batch) >= self.max_batch_size:
+                    break
+                if (ticket.max_new_tokens, ticket.temperature) != (seed.max_new_tokens, seed.temperature):
+                    continue
+                new_longest = max(longest, ticket.prompt_tokens)
+                new_total = total + ticket.prompt_tokens
+                padded = new_longest * (len(batch) + 1)
+                if (padded - new_total) / padded > self.max_padding_ratio:
+                    continue
+                batch.append(ticket)
+                longest, total = new_longest, new_total
+            chosen = {id(ticket) for ticket in batch}
+            self._pending = [ticket for ticket in self._pending if id(ticket) not in chosen]
+            return [ticket for ticket in batch if ticket.future.set_running_or_notify_cancel()]
+
+    def _forget(self, ticket: GenerationTicket) -> None:
+        if ticket.request_id and self._by_request_id.get(ticket.request_id) is ticket:
+            del self._by_request_id[ticket.request_id]
+
+    def _urgency(self, ticket: GenerationTicket, now: float) -> Tuple[int, int]:
+        priority = ticket.priority
+        if now - ticket.enqueued_at > self.starvation_seconds:
+            priority = PRIORITY_CHAT
+        return priority, ticket.seq
+
+    def _execute(self, batch: List[GenerationTicket]) -> None:
+        started = time.monotonic()
+        try:
+            completions = self.llm.complete(
+                [ticket.prompt for ticket in batch],
+                max_new_tokens=batch[0].max_new_tokens,
+                temperature=batch[0].temperature,
+                should_stop=[ticket.cancelled.is_set for ticket in batch],
+            )
+        except Exception as exc:  # fail this batch's callers, keep serving others
+            logger.exception("Generation batch of %s failed", len(batch))
+            for ticket in batch:
+                ticket.future.set_exception(exc)
+            completions = None
+        finally:
+            self.busy_seconds += time.monotonic() - started
+            self.batches += 1
+            with self._cond:
+                for ticket in batch:
+                    self._forget(ticket)
+        if completions is None:
+            return
+        for ticket, completion in zip(batch, completions):
+            self.generated_tokens += completion.new_tokens
+            if ticket.cancelled.is_set():
+                ticket.future.set_exception(CancelledError())
+                continue
+            self.completed += 1
+            ticket.future.set_result(completion.text)
+        logger.debug("Generated batch of %s in %.2fs", len(batch), time.monotonic() - started)
+
+
+class ScheduledLLM(LLMClient):
+    """``LLMClient`` that routes chat and drafting through a ``GenerationScheduler``."""
+
+    def __init__(self, scheduler: GenerationScheduler, timeout: float | None = None) -> None:
+        self.scheduler = scheduler
+        self.timeout = timeout if timeout is not None else settings.llm_request_timeout
+
+    def chat(self, system_prompt: str, messages: List[dict]) -> str:
+        prompt = self.scheduler.llm.build_chat_prompt(system_prompt, messages)
+        return self.scheduler.submit(prompt, priority=PRIORITY_CHAT).result(timeout=self.timeout)
+
+    def generate_email_draft(self, instruction: str, context_emails: List[Email]) -> str:
+        prompt = self.scheduler.llm.build_draft_prompt(instruction, context_emails)
+        return self.scheduler.submit(prompt, priority=PRIORITY_DRAFT).result(timeout=self.timeout)
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from typing import List
 
 from transformers import pipeline
 
@@ -15,6 +16,10 @@ class Summarizer(ABC):
     def summarize(self, text: str, max_length: int = 128) -> str:
         """Generate a summary of the text."""
 
+    def summarize_batch(self, texts: List[str], max_length: int = 128) -> List[str]:
+        """Summarize several texts; implementations may share forward passes."""
+        return [self.summarize(text, max_length=max_length) for text in texts]
+
 
 class HFSummarizer(Summarizer):
     """HuggingFace pipeline-based summarizer."""
@@ -30,3 +35,20 @@ class HFSummarizer(Summarizer):
         result = self.pipeline(text, max_length=max_length, min_length=max_length // 2, do_sample=False)
         return result[0]["summary_text"]
 
+    def summarize_batch(self, texts: List[str], max_length: int = 128, batch_size: int = 8) -> List[str]:
+        summaries = [""] * len(texts)
+        pending = [i for i, text in enumerate(texts) if text.strip()]
+        if not pending:
+            return summaries
+        results = self.pipeline(
+            [texts[i] for i in pending],
+            max_length=max_length,
+            min_length=max_length // 2,
+            do_sample=False,
+            truncation=True,
+            batch_size=batch_size,
+        )
+        for i, result in zip(pending, results):
+            summaries[i] = result["summary_text"]
+        return summaries
+
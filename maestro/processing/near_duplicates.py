@@ -0,0 +1,173 @@
+"""MinHash fingerprints and an LSH index for spotting near-duplicate emails."""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import struct
+import threading
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.engine import make_url
+
+from maestro.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_TOKEN_RE = re.compile(r"\w+")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def index_path_for(database_url: str | None = None) -> Path:
+    """Place the LSH index next to a file database, or beside the FAISS index otherwise."""
+    url = make_url(database_url or settings.database_url)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return Path(url.database + ".lsh")
+    return settings.faiss_index_path.with_name("near_duplicates.lsh")
+
+
+class NearDuplicateIndex:
+    """Cluster representatives keyed by Gmail id, looked up by MinHash LSH.
+
+    Texts are reduced to word shingles (digits normalized, so order numbers
+    and dates do not break a match) and hashed with ``num_perm`` permutations.
+    Signatures are split into ``bands``; two emails become candidates when any
+    band matches, and a candidate counts as a near-duplicate when its estimated
+    Jaccard similarity reaches ``threshold``. Only representatives are stored.
+
+    ``persist`` appends new representatives to a ``<path>.log`` file and only
+    rewrites the snapshot at ``path`` once the log outgrows it.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        threshold: float | None = None,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = Path(path or index_path_for())
+        self.threshold = threshold if threshold is not None else settings.near_duplicate_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [defaultdict(list) for _ in range(bands)]
+        self._log_path = self.path.with_name(self.path.name + ".log")
+        self._unsaved: List[Tuple[str, np.ndarray]] = []
+        self._logged = 0
+        if self.path.exists():
+            self._load()
+        if self._log_path.exists():
+            self._replay_log()
+        self._unsaved.clear()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of ``text``, or None when it is too short to compare."""
+        tokens = _TOKEN_RE.findall(_DIGITS_RE.sub("0", text.lower()))
+        if len(tokens) < self.shingle_size:
+            return None
+        shingles = {" ".join(tokens[i : i + self.shingle_size]) for i in range(len(tokens) - self.shingle_size + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # Universal hashing (a * x + b) mod p; uint64 wraparound is accepted, as in datasketch.
+        permuted = ((hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def match(self, signature: np.ndarray) -> Optional[str]:
+        """Gmail id of the most similar representative at or above the threshold."""
+        with self._lock:
+            candidates = {key for band, bucket in enumerate(self._buckets) for key in bucket.get(self._band(signature, band), ())}
+            best, best_score = None, self.threshold
+            for key in candidates:
+                score = float(np.mean(self._signatures[key] == signature))
+                if score >= best_score:
+                    best, best_score = key, score
+            return best
+
+    def add(self, gmail_id: str, signature: np.ndarray) -> None:
+        with self._lock:
+            if gmail_id in self._signatures:
+                return
+            self._signatures[gmail_id] = signature
+            self._unsaved.append((gmail_id, signature))
+            for band in range(self.bands):
+                self._buckets[band][self._band(signature, band)].append(gmail_id)
+
+    def persist(self) -> None:
+        """Save representatives added since the last call; a no-op when there are none."""
+        with self._file_lock:
+            self._persist()
+
+    def _persist(self) -> None:
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, []
+            if not unsaved:
+                return
+            self._logged += len(unsaved)
+            compact = self._logged > max(len(self._signatures) - self._logged, 1024)
+            if compact:
+                keys = list(self._signatures)
+                signatures = np.vstack([self._signatures[key] for key in keys])
+                self._logged = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if compact:
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with tmp_path.open("wb") as fh:
+                np.savez(fh, keys=np.asarray(keys, dtype=str), signatures=signatures)
+            os.replace(tmp_path, self.path)
+            self._log_path.unlink(missing_ok=True)
+            return
+        with self._log_path.open("ab") as fh:
+            for key, signature in unsaved:
+                encoded = key.encode("utf-8")
+                fh.write(struct.pack("<H", len(encoded)) + encoded + signature.astype("<u8").tobytes())
+
+    def _band(self, signature: np.ndarray, band: int) -> bytes:
+        return signature[band * self.rows : (band + 1) * self.rows].tobytes()
+
+    def _load(self) -> None:
+        with np.load(self.path) as data:
+            keys, signatures = data["keys"], data["signatures"]
+        if signatures.shape[1:] != (self.num_perm,):
+            logger.warning("Ignoring near-duplicate index %s built with different parameters", self.path)
+            return
+        for key, signature in zip(keys.tolist(), signatures):
+            self.add(key, signature)
+        logger.info("Loaded %s near-duplicate representatives from %s", len(self), self.path)
+
+    def _replay_log(self) -> None:
+        data = self._log_path.read_bytes()
+        width = self.num_perm * 8
+        offset = 0
+        while offset + 2 <= len(data):
+            (length,) = struct.unpack_from("<H", data, offset)
+            end = offset + 2 + length + width
+            if end > len(data):
+                # A write cut short by a crash: drop the partial record so later appends stay aligned.
+                with self._log_path.open("r+b") as fh:
+                    fh.truncate(offset)
+                break
+            key = data[offset + 2 : offset + 2 + length].decode("utf-8")
+            signature = np.frombuffer(data, dtype="<u8", count=self.num_perm, offset=offset + 2 + length)
+            self.add(key, signature.astype(np.uint64))
+            self._logged += 1
+            offset = end
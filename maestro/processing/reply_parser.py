@@ -0,0 +1,77 @@
+"""Separate the new part of a message from quoted history and signatures."""
+from __future__ import annotations
+
+import re
+from typing import List
+
+# Headers that introduce the quoted previous message in a reply.
+_REPLY_HEADER_RE = re.compile(
+    r"^(On\s.{1,200}\swrote:|Le\s.{1,200}\sa écrit\s?:|Am\s.{1,200}\sschrieb\s.{0,80}:|El\s.{1,200}\sescribió:)\s*$",
+    re.IGNORECASE,
+)
+_ORIGINAL_MESSAGE_RE = re.compile(r"^-{2,}\s*(Original Message|Forwarded message|Begin forwarded message)\s*-*:?\s*$", re.IGNORECASE)
+_BEGIN_FORWARDED_RE = re.compile(r"^Begin forwarded message:\s*$", re.IGNORECASE)
+_OUTLOOK_SEPARATOR_RE = re.compile(r"^_{10,}\s*$")
+_HEADER_LINE_RE = re.compile(r"^\*{0,2}(From|Sent|Date|To|Cc|Subject)\s*:\*{0,2}\s", re.IGNORECASE)
+_SIGNATURE_RE = re.compile(
+    r"^(--\s?|Sent from my \w+.*|Sent from Mail for Windows.*|Get Outlook for \w+.*|Sent from Yahoo Mail.*)$",
+    re.IGNORECASE,
+)
+
+
+class ReplyParser:
+    """Detect quoted replies, forwarded headers and signatures in plain text."""
+
+    def new_content(self, text: str) -> str:
+        """Return only the text the sender wrote for this message.
+
+        Works for top-posted, bottom-posted and interleaved replies: a history
+        header followed by ``>``-quoted lines only hides those lines, and text
+        written after the quote is kept. History that is not ``>``-quoted
+        (Outlook header blocks, forwards) runs to the end of the message.
+        Falls back to the full text when nothing would remain, e.g. for a
+        forward sent without a comment.
+        """
+        if not text:
+            return ""
+        lines = text.splitlines()
+        kept: List[str] = []
+        i = 0
+        while i < len(lines):
+            stripped = lines[i].strip()
+            if _SIGNATURE_RE.match(stripped):
+                break
+            header_lines = self._history_header(lines, i, stripped)
+            if header_lines:
+                i += header_lines
+                while i < len(lines) and not lines[i].strip():
+                    i += 1
+                if i < len(lines) and not lines[i].lstrip().startswith(">"):
+                    break  # unquoted history continues to the end
+                continue
+            if not stripped.startswith(">"):
+                # Quoted lines are dropped; inline and trailing answers are kept.
+                kept.append(lines[i])
+            i += 1
+        new_text = "\n".join(kept).strip()
+        return new_text or text.strip()
+
+    @staticmethod
+    def _history_header(lines: List[str], i: int, stripped: str) -> int:
+        """Number of lines taken by a history header starting at line ``i``, or 0."""
+        if _ORIGINAL_MESSAGE_RE.match(stripped) or _BEGIN_FORWARDED_RE.match(stripped):
+            return 1
+        if _REPLY_HEADER_RE.match(stripped):
+            return 1
+        # "On Mon, Jan 1, 2024 at 9:00 AM Jane <jane@example.com>\nwrote:" wrapped by the client.
+        if stripped.lower().startswith("on ") and i + 1 < len(lines):
+            if _REPLY_HEADER_RE.match(f"{stripped} {lines[i + 1].strip()}"):
+                return 2
+        if _OUTLOOK_SEPARATOR_RE.match(stripped):
+            return 1
+        # Outlook-style header block: "From:" followed closely by other headers.
+        if _HEADER_LINE_RE.match(stripped) and stripped.lower().lstrip("*").startswith("from"):
+            following = [l.strip() for l in lines[i + 1 : i + 4]]
+            if sum(1 for l in following if _HEADER_LINE_RE.match(l)) >= 2:
+                return 1
+        return 0
@@ -17,7 +17,7 @@ class ChatService:
 
     def chat_with_emails(self, history: List[dict], top_k: int = 5) -> str:
         user_message = next((m["content"] for m in reversed(history) if m.get("role") == "user"), "")
-        relevant_emails = self.search_service.search_semantic(user_message, limit=top_k)
+        relevant_emails = self.search_service.search_semantic(user_message, limit=top_k, collapse=True)
         context_snippets = self._format_context(relevant_emails)
         system_prompt = (
             "You are Maestro, an assistant that answers based on the user's email archive. "
@@ -15,6 +15,6 @@ class DraftingService:
     def draft_email(self, instruction: str, related_query: str | None = None):
         context_emails = []
         if related_query:
-            context_emails = self.search.search_semantic(related_query, limit=5)
+            context_emails = self.search.search_semantic(related_query, limit=5, collapse=True)
         return self.llm.generate_email_draft(instruction, context_emails)
 
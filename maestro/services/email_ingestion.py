@@ -1,20 +1,32 @@
 """Email ingestion pipeline."""
 from __future__ import annotations
 
+import contextlib
 import logging
+from typing import Dict, List
 
+from maestro.core.config import settings
+from maestro.data.models import Email
 from maestro.data.repository import EmailRepository
-from maestro.gmail.client import GmailClient, GoogleGmailClient
+from maestro.gmail.client import GmailClient, GoogleGmailClient, RawGmailEmail
 from maestro.processing.html_cleaner import HTMLCleaner
+from maestro.processing.near_duplicates import NearDuplicateIndex
+from maestro.processing.reply_parser import ReplyParser
 from maestro.nlp.embeddings import EmbeddingIndex, EmbeddingModel
-from maestro.nlp.indexing import IndexCoordinator, WordIndex
+from maestro.nlp.indexing import FacetIndex, IndexCoordinator, IndexGeneration, WordIndex
 from maestro.nlp.summarizer import Summarizer
 
 logger = logging.getLogger(__name__)
 
 
 class EmailIngestionService:
-    """Download, clean, store, summarize, and index emails."""
+    """Download, clean, store, summarize, and index emails.
+
+    With a ``NearDuplicateIndex``, each email's new content is fingerprinted first.
+    In ``reuse`` mode a near-duplicate is stored with ``duplicate_of`` set and
+    takes its representative's summary and vector instead of running the
+    models; in ``skip`` mode it is not stored at all.
+    """
 
     def __init__(
         self,
@@ -23,26 +35,102 @@ class EmailIngestionService:
         cleaner: HTMLCleaner,
         embedding_model: EmbeddingModel,
         embedding_index: EmbeddingIndex,
-        summarizer: Summarizer,
+        summarizer: Summarizer | None,
         word_index: WordIndex,
+        reply_parser: ReplyParser | None = None,
+        summarize_on_ingest: bool | None = None,
+        facet_index: FacetIndex | None = None,
+        generation: IndexGeneration | None = None,
+        near_duplicates: NearDuplicateIndex | None = None,
+        near_duplicate_mode: str | None = None,
     ) -> None:
         self.gmail_client = gmail_client
         self.repository = repository
         self.cleaner = cleaner
+        self.reply_parser = reply_parser or ReplyParser()
         self.summarizer = summarizer
-        self.index_coordinator = IndexCoordinator(embedding_model, embedding_index, word_index)
+        if summarize_on_ingest is None:
+            summarize_on_ingest = settings.summarize_on_ingest
+        # Without inline summarization, summaries are produced lazily by SummaryService.
+        self.summarize_on_ingest = summarize_on_ingest and summarizer is not None
+        self.generation = generation
+        self.near_duplicate_mode = near_duplicate_mode or settings.near_duplicate_mode
+        self.near_duplicates = near_duplicates if self.near_duplicate_mode != "off" else None
+        self.index_coordinator = IndexCoordinator(embedding_model, embedding_index, word_index, facet_index)
 
     def sync_gmail(self, max_results: int = 200) -> int:
         raw_emails = self.gmail_client.fetch_emails(max_results=max_results)
-        domain_emails = []
-        for raw in raw_emails:
-            plain = self.cleaner.to_plain_text(raw.raw_html)
-            summary = self.summarizer.summarize(plain)
-            email = GoogleGmailClient.to_email(raw, plain_text=plain, summary=summary)
-            domain_emails.append(email)
-        self.repository.save_emails(domain_emails)
-        persisted = self.repository.list_recent(limit=len(domain_emails))
-        self.index_coordinator.index_emails(persisted)
-        logger.info("Synced %s emails", len(domain_emails))
+        plain_texts = self.cleaner.clean_many([raw.raw_html for raw in raw_emails])
+        new_contents = [self.reply_parser.new_content(plain) for plain in plain_texts]
+        representative_of = self._find_near_duplicates(raw_emails, new_contents)
+        if self.near_duplicate_mode == "skip" and representative_of:
+            kept = [i for i, raw in enumerate(raw_emails) if raw.gmail_id not in representative_of]
+            logger.info("Skipping %s near-duplicate emails", len(raw_emails) - len(kept))
+            raw_emails = [raw_emails[i] for i in kept]
+            plain_texts = [plain_texts[i] for i in kept]
+            new_contents = [new_contents[i] for i in kept]
+            representative_of = {}
+        domain_emails = [
+            GoogleGmailClient.to_email(raw, plain_text=plain, new_content=new)
+            for raw, plain, new in zip(raw_emails, plain_texts, new_contents)
+        ]
+        with self._index_write_lock():
+            duplicates = self._store_and_index(domain_emails, representative_of)
+        if self.generation is not None and domain_emails:
+            self.generation.bump()
+        logger.info("Synced %s emails (%s near-duplicates)", len(domain_emails), len(duplicates))
         return len(domain_emails)
 
+    def _index_write_lock(self):
+        """Hold the vector index's write lock from saving rows until they are indexed.
+
+        A concurrent reindex catches up on new rows under the same lock, so a
+        row is embedded either before the swap or after it, never twice.
+        """
+        return getattr(self.index_coordinator.embedding_index, "write_lock", None) or contextlib.nullcontext()
+
+    def _store_and_index(self, domain_emails: List[Email], representative_of: Dict[str, str]) -> List[Email]:
+        # Representatives are saved first so their duplicates can point at their ids.
+        representatives = [email for email in domain_emails if email.gmail_id not in representative_of]
+        duplicates = [email for email in domain_emails if email.gmail_id in representative_of]
+        if self.summarize_on_ingest and representatives:
+            summaries = self.summarizer.summarize_batch([email.new_content for email in representatives])
+            for email, summary in zip(representatives, summaries):
+                email.summary = summary
+        self.repository.save_emails(representatives)
+        if duplicates:
+            stored = self.repository.get_by_gmail_ids(sorted(set(representative_of.values())))
+            by_gmail_id = {email.gmail_id: email for email in stored}
+            for email in duplicates:
+                representative = by_gmail_id.get(representative_of[email.gmail_id])
+                if representative is not None:
+                    email.duplicate_of = representative.id
+                    email.summary = representative.summary
+            self.repository.save_emails(duplicates)
+        if self.near_duplicates is not None:
+            self.near_duplicates.persist()
+        persisted = self.repository.get_by_gmail_ids([email.gmail_id for email in domain_emails])
+        self.index_coordinator.index_emails(persisted)
+        return duplicates
+
+    def _find_near_duplicates(self, raw_emails: List[RawGmailEmail], new_contents: List[str]) -> Dict[str, str]:
+        """Map the Gmail id of each near-duplicate to its representative's Gmail id.
+
+        Emails are compared on their new content only: quoted history would
+        make a short reply look like a copy of the message it answers.
+        """
+        if self.near_duplicates is None:
+            return {}
+        representative_of: Dict[str, str] = {}
+        for raw, new in zip(raw_emails, new_contents):
+            signature = self.near_duplicates.signature(new)
+            if signature is None:
+                continue
+            match = self.near_duplicates.match(signature)
+            if match is None or match == raw.gmail_id:
+                # Later emails in this batch can match it before it is stored.
+                self.near_duplicates.add(raw.gmail_id, signature)
+            else:
+                representative_of[raw.gmail_id] = match
+        return representative_of
+
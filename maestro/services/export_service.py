@@ -0,0 +1,50 @@
+"""Streaming mailbox export."""
+from __future__ import annotations
+
+import json
+from typing import IO, Iterator
+
+from maestro.data.filters import EmailFilters
+from maestro.data.models import Email
+from maestro.data.repository import EmailRepository
+
+
+class ExportService:
+    """Export emails as newline-delimited JSON in constant memory."""
+
+    def __init__(self, repository: EmailRepository, batch_size: int = 500) -> None:
+        self.repository = repository
+        self.batch_size = batch_size
+
+    def iter_ndjson(self, filters: EmailFilters | None = None, include_html: bool = False) -> Iterator[str]:
+        """Yield one JSON document per email, each terminated by a newline."""
+        for email in self.repository.iter_emails(filters=filters, batch_size=self.batch_size, include_html=include_html):
+            yield json.dumps(self._record(email, include_html), ensure_ascii=False) + "\n"
+
+    def export(self, out: IO[str], filters: EmailFilters | None = None, include_html: bool = False) -> int:
+        """Write the export to ``out`` and return the number of emails written."""
+        count = 0
+        for line in self.iter_ndjson(filters=filters, include_html=include_html):
+            out.write(line)
+            count += 1
+        return count
+
+    @staticmethod
+    def _record(email: Email, include_html: bool) -> dict:
+        record = {
+            "id": email.id,
+            "gmail_id": email.gmail_id,
+            "thread_id": email.thread_id,
+            "date": email.date.isoformat() if email.date else None,
+            "from_address": email.from_address,
+            "to_addresses": email.to_addresses,
+            "cc_addresses": email.cc_addresses,
+            "bcc_addresses": email.bcc_addresses,
+            "subject": email.subject,
+            "summary": email.summary,
+            "plain_text": email.plain_text,
+            "new_content": email.new_content,
+        }
+        if include_html:
+            record["raw_html"] = email.raw_html
+        return record
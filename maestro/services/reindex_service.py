@@ -0,0 +1,205 @@
+"""Full rebuild of the vector and keyword indexes from stored emails."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from maestro.core.config import settings
+from maestro.data.models import Email
+from maestro.data.repository import EmailRepository
+from maestro.nlp.embeddings import EmbeddingModel, FaissEmbeddingIndex
+from maestro.nlp.indexing import IndexGeneration, WordIndex, add_vectors
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReindexStatus:
+    """Progress of the current or last reindex run."""
+
+    state: str = "idle"  # idle | running | done | failed
+    indexed: int = 0
+    last_id: int = 0
+    resumed_from: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    model: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class _Checkpoint:
+    last_id: int = 0
+    indexed: int = 0
+    dim: int = 0
+    model: str = ""
+
+
+class ReindexService:
+    """Rebuild FAISS and the keyword index from the repository without interrupting search.
+
+    Emails are streamed in id order, ``chunk_size`` at a time, with the next
+    chunk read from SQLite while the current one is embedded. Vectors go into a
+    separate ``<index>.building`` file that is checkpointed every
+    ``checkpoint_seconds``, so an interrupted run resumes close to where it
+    stopped. When every row is embedded,
+    the new file is renamed over the live one and swapped in memory while new
+    writes are held back, and the index generation is bumped.
+    """
+
+    def __init__(
+        self,
+        repository: EmailRepository,
+        embedding_model: EmbeddingModel,
+        embedding_index: FaissEmbeddingIndex,
+        word_index: WordIndex,
+        generation: IndexGeneration | None = None,
+        chunk_size: int | None = None,
+        batch_size: int | None = None,
+        workers: int | None = None,
+        checkpoint_seconds: float | None = None,
+    ) -> None:
+        self.repository = repository
+        self.embedding_model = embedding_model
+        self.embedding_index = embedding_index
+        self.word_index = word_index
+        self.generation = generation
+        self.chunk_size = chunk_size or settings.reindex_chunk_size
+        self.batch_size = batch_size or settings.reindex_batch_size
+        self.workers = workers or settings.reindex_workers
+        self.checkpoint_seconds = checkpoint_seconds if checkpoint_seconds is not None else settings.reindex_checkpoint_seconds
+        self.status = ReindexStatus()
+        self._run_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def building_path(self) -> Path:
+        return self.embedding_index.index_path.with_name(self.embedding_index.index_path.name + ".building")
+
+    @property
+    def checkpoint_path(self) -> Path:
+        return self.embedding_index.index_path.with_name(self.embedding_index.index_path.name + ".reindex.json")
+
+    def start_background(self, restart: bool = False) -> bool:
+        """Run ``reindex`` in a background thread; returns False if one is already running."""
+        if self._run_lock.locked():
+            return False
+        self._thread = threading.Thread(target=self._run_quietly, args=(restart,), name="reindex", daemon=True)
+        self._thread.start()
+        return True
+
+    def reindex(self, restart: bool = False) -> ReindexStatus:
+        """Rebuild both indexes; resumes from the checkpoint unless ``restart`` is set."""
+        if not self._run_lock.acquire(blocking=False):
+            raise RuntimeError("A reindex is already running")
+        try:
+            return self._reindex(restart)
+        except Exception as exc:
+            self.status.state = "failed"
+            self.status.error = str(exc)
+            self.status.finished_at = time.time()
+            raise
+        finally:
+            self._run_lock.release()
+
+    def _run_quietly(self, restart: bool) -> None:
+        try:
+            self.reindex(restart=restart)
+        except Exception:
+            logger.exception("Reindex failed")
+
+    def _reindex(self, restart: bool) -> ReindexStatus:
+        model_name = getattr(self.embedding_model, "model_name", type(self.embedding_model).__name__)
+        dim = int(self.embedding_model.embed_texts(["reindex"]).shape[1])
+        checkpoint = None if restart else self._load_checkpoint(model_name, dim)
+        if checkpoint is None:
+            checkpoint = _Checkpoint(dim=dim, model=model_name)
+            self.building_path.unlink(missing_ok=True)
+        self.status = ReindexStatus(
+            state="running",
+            indexed=checkpoint.indexed,
+            last_id=checkpoint.last_id,
+            resumed_from=checkpoint.last_id,
+            started_at=time.time(),
+            model=model_name,
+        )
+        building = FaissEmbeddingIndex(dim=dim, index_path=self.building_path, use_gpu=False, autosave=False)
+        # Vectors written after the last checkpoint are re-embedded, so drop them.
+        building.remove_ids_from(checkpoint.last_id + 1)
+        logger.info("Reindexing from id %s into %s", checkpoint.last_id, self.building_path)
+
+        self.embedding_model.start_workers(self.workers)
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="reindex-read") as reader:
+                pending = reader.submit(self.repository.list_after_id, checkpoint.last_id, self.chunk_size)
+                last_saved = time.monotonic()
+                while True:
+                    chunk = pending.result()
+                    if not chunk:
+                        break
+                    pending = reader.submit(self.repository.list_after_id, chunk[-1].id, self.chunk_size)
+                    self._embed_into(building, chunk)
+                    checkpoint.last_id = chunk[-1].id
+                    checkpoint.indexed += len(chunk)
+                    # Rewriting the whole side file is O(size); do it on an interval, not per chunk.
+                    if time.monotonic() - last_saved >= self.checkpoint_seconds:
+                        building.persist()
+                        self._save_checkpoint(checkpoint)
+                        last_saved = time.monotonic()
+                    self.status.indexed, self.status.last_id = checkpoint.indexed, checkpoint.last_id
+
+            words = WordIndex()
+            words.build(self.repository.iter_emails(batch_size=self.chunk_size))
+
+            # Hold back live writes while catching up on mail that arrived during the rebuild.
+            with self.embedding_index.write_lock:
+                while chunk := self.repository.list_after_id(checkpoint.last_id, self.chunk_size):
+                    self._embed_into(building, chunk)
+                    words.build(chunk)
+                    checkpoint.last_id = chunk[-1].id
+                    checkpoint.indexed += len(chunk)
+                self.embedding_index.swap_in(building)
+                self.word_index.replace_with(words)
+        finally:
+            self.embedding_model.stop_workers()
+
+        self.checkpoint_path.unlink(missing_ok=True)
+        if self.generation is not None:
+            self.generation.bump()
+        self.status.state = "done"
+        self.status.indexed, self.status.last_id = checkpoint.indexed, checkpoint.last_id
+        self.status.finished_at = time.time()
+        logger.info("Reindex complete: %s emails", checkpoint.indexed)
+        return self.status
+
+    def _embed_into(self, building: FaissEmbeddingIndex, chunk: List[Email]) -> None:
+        # Representatives have lower ids than their near-duplicates, so their vectors are already in ``building``.
+        add_vectors(building, chunk, lambda texts: self.embedding_model.embed_batch(texts, batch_size=self.batch_size))
+
+    def _load_checkpoint(self, model_name: str, dim: int) -> Optional[_Checkpoint]:
+        if not self.checkpoint_path.exists() or not self.building_path.exists():
+            return None
+        try:
+            checkpoint = _Checkpoint(**json.loads(self.checkpoint_path.read_text(encoding="utf-8")))
+        except (ValueError, TypeError):
+            logger.warning("Ignoring unreadable reindex checkpoint %s", self.checkpoint_path)
+            return None
+        if checkpoint.model != model_name or checkpoint.dim != dim:
+            logger.info("Embedding model changed since the checkpoint; starting over")
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint: _Checkpoint) -> None:
+        tmp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(asdict(checkpoint)), encoding="utf-8")
+        os.replace(tmp_path, self.checkpoint_path)
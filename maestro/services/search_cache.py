@@ -0,0 +1,105 @@
+"""Bounded, TTL-limited cache of search results."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from sqlalchemy import inspect
+
+from maestro.core.config import settings
+from maestro.data.models import Email
+from maestro.nlp.indexing import IndexGeneration
+
+# Cached rows leave out the raw HTML, which search callers never read and which dominates memory.
+_SNAPSHOT_KEYS = tuple(attr.key for attr in inspect(Email).column_attrs if attr.key != "raw_html")
+EmailSnapshot = Tuple[Any, ...]
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query.
+
+    Searches run on this form and the cache is keyed on it, so two spellings
+    that share a key also share their results.
+    """
+    return " ".join(query.casefold().split())
+
+
+def snapshot_email(email: Email) -> EmailSnapshot:
+    """Immutable copy of an email's column values, safe to share between callers."""
+    return tuple(getattr(email, key) for key in _SNAPSHOT_KEYS)
+
+
+def restore_email(row: EmailSnapshot) -> Email:
+    """Fresh, session-less ``Email`` built from a snapshot."""
+    return Email(**dict(zip(_SNAPSHOT_KEYS, row)))
+
+
+class SearchResultCache:
+    """LRU cache whose entries expire after a TTL or when the index generation moves.
+
+    Entries remember the generation that was current when their computation
+    started, so results computed while an ingestion commits are never served
+    afterwards.
+    """
+
+    def __init__(self, generation: IndexGeneration, max_entries: int | None = None, ttl_seconds: float | None = None) -> None:
+        self.generation = generation
+        self.max_entries = max_entries if max_entries is not None else settings.search_cache_size
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.search_cache_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.evicted = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        current = self.generation.value
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, generation, value = entry
+                if generation != current:
+                    self.invalidated += 1
+                    del self._entries[key]
+                elif expires_at <= now:
+                    self.expired += 1
+                    del self._entries[key]
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return value
+            self.misses += 1
+        value = compute()
+        if self.max_entries <= 0:
+            return value
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, current, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+                "evicted": self.evicted,
+                "generation": self.generation.value,
+            }
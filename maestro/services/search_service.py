@@ -1,29 +1,288 @@
 """Search service for Maestro."""
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from maestro.data.filters import EmailFilters
+from maestro.data.models import Email
+from maestro.data.pagination import KeysetCursor, ScoreCursor, query_fingerprint
 from maestro.data.repository import EmailRepository
 from maestro.nlp.embeddings import EmbeddingIndex, EmbeddingModel
+from maestro.nlp.indexing import FacetIndex
 from maestro.nlp.retrieval import semantic_retrieve
+from maestro.services.search_cache import SearchResultCache, normalize_query, restore_email, snapshot_email
+from maestro.services.summary_service import SummaryService
+
+T = TypeVar("T")
+
+
+def cluster_key(email: Email) -> int:
+    """Id shared by an email and its near-duplicates."""
+    return email.duplicate_of if email.duplicate_of is not None else email.id
+
+
+@dataclass
+class SearchPage:
+    """One page of results plus the token for the next page, if any."""
+
+    emails: List[Email]
+    next_cursor: Optional[str] = None
 
 
 class SearchService:
     """Provide keyword and semantic search over emails."""
 
-    def __init__(self, repository: EmailRepository, embedding_model: EmbeddingModel, embedding_index: EmbeddingIndex) -> None:
+    def __init__(
+        self,
+        repository: EmailRepository,
+        embedding_model: EmbeddingModel,
+        embedding_index: EmbeddingIndex,
+        summary_service: SummaryService | None = None,
+        facet_index: FacetIndex | None = None,
+        cache: SearchResultCache | None = None,
+    ) -> None:
         self.repository = repository
         self.embedding_model = embedding_model
         self.embedding_index = embedding_index
+        self.summary_service = summary_service
+        self.facet_index = facet_index
+        self.cache = cache
+
+    def search_keyword(self, query: str, limit: int = 20, filters: EmailFilters | None = None, collapse: bool = False):
+        query = normalize_query(query)
+        return list(
+            self._cached(
+                ("keyword", query, filters, limit, collapse),
+                filters,
+                lambda: self._with_summaries(self._keyword(query, limit, filters, collapse)),
+            )
+        )
+
+    def search_semantic(self, query: str, limit: int = 20, filters: EmailFilters | None = None, collapse: bool = False):
+        query = normalize_query(query)
+        return list(
+            self._cached(
+                ("semantic", query, filters, limit, collapse),
+                filters,
+                lambda: self._with_summaries(self._semantic(query, limit, filters, collapse)),
+            )
+        )
+
+    def search_hybrid(self, query: str, limit: int = 20, filters: EmailFilters | None = None, collapse: bool = False):
+        query = normalize_query(query)
+        return list(
+            self._cached(
+                ("hybrid", query, filters, limit, collapse),
+                filters,
+                lambda: self._hybrid(query, limit, filters, collapse),
+            )
+        )
+
+    def search_page(
+        self,
+        query: str,
+        mode: str = "semantic",
+        limit: int = 20,
+        filters: EmailFilters | None = None,
+        cursor: str | None = None,
+        collapse: bool = False,
+    ) -> SearchPage:
+        """Return one page of results for ``mode``; pass ``next_cursor`` back to continue.
+
+        Keyword pages use keyset pagination on (date, id). Semantic pages
+        continue after the last (distance, id) pair, which is stable while the
+        index is unchanged. Hybrid results are merged and are not paginated.
+        Near-duplicates share their representative's vector, so a collapsed
+        semantic cluster never straddles two pages; collapsed keyword pages
+        only collapse within the page. Raises ``ValueError`` for malformed or
+        mismatched cursors. Like every search here, the query is run in its
+        ``normalize_query`` form, the same string the cache is keyed on.
+        """
+        query = normalize_query(query)
+        page = self._cached(
+            ("page", mode, query, filters, limit, cursor, collapse),
+            filters,
+            lambda: self._search_page(query, mode, limit, filters, cursor, collapse),
+        )
+        return SearchPage(list(page.emails), page.next_cursor)
+
+    def list_page(self, limit: int = 50, filters: EmailFilters | None = None, cursor: str | None = None) -> SearchPage:
+        """Return one page of the most recent emails using keyset pagination."""
+        page = self._cached(("list", filters, limit, cursor), filters, lambda: self._list_page(limit, filters, cursor))
+        return SearchPage(list(page.emails), page.next_cursor)
+
+    def cache_stats(self) -> dict:
+        """Hit-rate and occupancy metrics for the result cache."""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def _cached(self, key: Hashable, filters: EmailFilters | None, compute: Callable[[], T]) -> T:
+        """Answer from the result cache, which is valid until the next ingestion commit."""
+        # Summary state changes without an ingestion commit, so those filters bypass the cache.
+        if self.cache is None or (filters is not None and filters.has_summary is not None):
+            return compute()
+        # Cache snapshots rather than ORM instances and hand every caller its own copies.
+        return self._thaw(self.cache.get_or_compute(key, lambda: self._freeze(compute())))
+
+    @staticmethod
+    def _freeze(value):
+        if isinstance(value, SearchPage):
+            return SearchPage(tuple(snapshot_email(email) for email in value.emails), value.next_cursor)
+        return tuple(snapshot_email(email) for email in value)
+
+    @staticmethod
+    def _thaw(value):
+        if isinstance(value, SearchPage):
+            return SearchPage([restore_email(row) for row in value.emails], value.next_cursor)
+        return [restore_email(row) for row in value]
+
+    def _search_page(
+        self, query: str, mode: str, limit: int, filters: EmailFilters | None, cursor: str | None, collapse: bool
+    ) -> SearchPage:
+        if mode == "keyword":
+            after = KeysetCursor.decode(cursor) if cursor else None
+            if not collapse:
+                emails = self.repository.search_by_keyword(query, limit=limit, filters=filters, after=after)
+                return SearchPage(self._with_summaries(emails), self._keyset_token(emails, limit))
+            emails, last, more = self._collapsed_keyword(query, limit, filters, after)
+            next_cursor = KeysetCursor(date=last.date, id=last.id).encode() if more and last is not None else None
+            return SearchPage(self._with_summaries(emails), next_cursor)
+        if mode == "hybrid":
+            if cursor:
+                raise ValueError("Hybrid search does not support cursors")
+            return SearchPage(self._hybrid(query, limit, filters, collapse))
+        return self._semantic_page(query, limit, filters, cursor, collapse)
+
+    def _list_page(self, limit: int, filters: EmailFilters | None, cursor: str | None) -> SearchPage:
+        after = KeysetCursor.decode(cursor) if cursor else None
+        emails = self.repository.list_recent(limit=limit, filters=filters, after=after)
+        return SearchPage(self._with_summaries(emails), self._keyset_token(emails, limit))
+
+    def _hybrid(self, query: str, limit: int, filters: EmailFilters | None, collapse: bool = False) -> List[Email]:
+        semantic_results = self._semantic(query, limit, filters, collapse)
+        keyword_results = self._keyword(query, limit, filters, collapse)
+        key = cluster_key if collapse else (lambda email: email.id)
+        seen = {key(email) for email in semantic_results}
+        merged = semantic_results + [email for email in keyword_results if key(email) not in seen]
+        return self._with_summaries(merged[:limit])
+
+    def _semantic_page(
+        self, query: str, limit: int, filters: EmailFilters | None, cursor: str | None, collapse: bool = False
+    ) -> SearchPage:
+        # ``query`` arrives normalized, as in the cache key, so a cached page never carries another spelling's cursor.
+        fingerprint = query_fingerprint(query, filters)
+        after = ScoreCursor.decode(cursor) if cursor else None
+        if after is not None and after.query != fingerprint:
+            raise ValueError("Cursor belongs to a different query")
+        emails, last_hit, consumed, more = self._semantic_hits(query, limit, filters, after, collapse)
+        next_cursor = None
+        if more and last_hit is not None:
+            last_id, last_score = last_hit
+            seen = (after.seen if after else 0) + consumed
+            next_cursor = ScoreCursor(score=last_score, id=last_id, seen=seen, query=fingerprint).encode()
+        return SearchPage(self._with_summaries(emails), next_cursor)
+
+    def _semantic_hits(
+        self, query: str, limit: int, filters: EmailFilters | None, after: ScoreCursor | None, collapse: bool
+    ) -> Tuple[List[Email], Optional[Tuple[int, float]], int, bool]:
+        """Return the page, the last hit it consumed, how many hits it consumed and whether more remain."""
+        allowed_ids = self._allowed_ids(filters)
+        if allowed_ids is not None and not len(allowed_ids):
+            return [], None, 0, False
+        query_vector = self.embedding_model.embed_texts([query])
+        seen = after.seen if after else 0
+        # Over-fetch by one to learn whether another page exists.
+        k = seen + limit + 1
+        clusters_of: Dict[int, int] = {}
+        while True:
+            raw_hits = self.embedding_index.search(query_vector, k=k, allowed_ids=allowed_ids)
+            hits = sorted(raw_hits, key=lambda hit: (hit[1], hit[0]))
+            if after is not None:
+                hits = [hit for hit in hits if (hit[1], hit[0]) > (after.score, after.id)]
+            if not collapse:
+                page = hits[:limit]
+                emails = self.repository.get_emails([email_id for email_id, _ in page])
+                return emails, (page[-1] if page else None), len(page), len(hits) > limit
+            # Only cluster ids are looked up while collapsing, and each id only once across k doublings.
+            unseen = [email_id for email_id, _ in hits if email_id not in clusters_of]
+            clusters_of.update(self.repository.cluster_ids(unseen))
+            kept, consumed, more = self._collapse_hits(hits, limit, clusters_of)
+            # Keep fetching until the page ends on a cluster boundary or the index runs out.
+            if more or len(raw_hits) < k:
+                emails = self.repository.get_emails(kept)
+                return emails, (hits[consumed - 1] if consumed else None), consumed, more
+            k *= 2
+
+    @staticmethod
+    def _collapse_hits(
+        hits: List[Tuple[int, float]], limit: int, clusters_of: Dict[int, int]
+    ) -> Tuple[List[int], int, bool]:
+        """Keep the best-ranked hit of each near-duplicate cluster, up to ``limit``."""
+        kept: List[int] = []
+        clusters: set[int] = set()
+        consumed = 0
+        for email_id, _ in hits:
+            cluster = clusters_of.get(email_id)
+            if cluster is not None and cluster not in clusters:
+                if len(kept) == limit:
+                    return kept, consumed, True
+                clusters.add(cluster)
+                kept.append(email_id)
+            consumed += 1
+        return kept, consumed, False
+
+    def _collapsed_keyword(
+        self, query: str, limit: int, filters: EmailFilters | None, after: KeysetCursor | None
+    ) -> Tuple[List[Email], Optional[Email], bool]:
+        """Return the newest email of each cluster, the last email consumed and whether more remain."""
+        kept: List[Email] = []
+        clusters: set[int] = set()
+        last: Optional[Email] = None
+        batch_size = limit * 2
+        while True:
+            batch = self.repository.search_by_keyword(query, limit=batch_size, filters=filters, after=after)
+            for email in batch:
+                if cluster_key(email) not in clusters:
+                    if len(kept) == limit:
+                        return kept, last, True
+                    clusters.add(cluster_key(email))
+                    kept.append(email)
+                last = email
+            if len(batch) < batch_size:
+                return kept, last, False
+            after = KeysetCursor(date=batch[-1].date, id=batch[-1].id)
+
+    @staticmethod
+    def _keyset_token(emails: List[Email], limit: int) -> Optional[str]:
+        if len(emails) < limit or not emails:
+            return None
+        return KeysetCursor(date=emails[-1].date, id=emails[-1].id).encode()
 
-    def search_keyword(self, query: str, limit: int = 20):
-        return self.repository.search_by_keyword(query, limit=limit)
+    def _keyword(self, query: str, limit: int, filters: EmailFilters | None = None, collapse: bool = False) -> List[Email]:
+        if collapse:
+            return self._collapsed_keyword(query, limit, filters, None)[0]
+        return self.repository.search_by_keyword(query, limit=limit, filters=filters)
 
-    def search_semantic(self, query: str, limit: int = 20):
-        return semantic_retrieve(query, self.repository, self.embedding_model, self.embedding_index, k=limit)
+    def _semantic(self, query: str, limit: int, filters: EmailFilters | None = None, collapse: bool = False) -> List[Email]:
+        if collapse:
+            return self._semantic_hits(query, limit, filters, None, collapse=True)[0]
+        allowed_ids = self._allowed_ids(filters)
+        return semantic_retrieve(
+            query, self.repository, self.embedding_model, self.embedding_index, k=limit, allowed_ids=allowed_ids
+        )
 
-    def search_hybrid(self, query: str, limit: int = 20):
-        semantic_results = self.search_semantic(query, limit=limit)
-        keyword_results = self.search_keyword(query, limit=limit)
-        seen = {email.id for email in semantic_results}
-        merged = semantic_results + [email for email in keyword_results if email.id not in seen]
-        return merged[:limit]
+    def _allowed_ids(self, filters: EmailFilters | None) -> Optional[np.ndarray]:
+        """Ids the vector search may return, from the ``FacetIndex`` when available, else SQL."""
+        if filters is None or filters.is_empty():
+            return None
+        if self.facet_index is not None:
+            return self.facet_index.candidates(filters)
+        return np.asarray(self.repository.filter_ids(filters), dtype="int64")
 
+    def _with_summaries(self, emails: List[Email]) -> List[Email]:
+        """Summarize results that lack a summary in one batch."""
+        if self.summary_service is None:
+            return emails
+        return self.summary_service.ensure_summaries(emails)
@@ -0,0 +1,377 @@
+"""Per-mailbox shards and scatter-gather search across them.
+
+Each mailbox lives in its own directory under ``settings.mailboxes_dir`` with
+its own SQLite database, FAISS index and Gmail token, so mailboxes grow
+independently and a single tenant can be searched without opening the others.
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import multiprocessing
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from maestro.core.config import settings
+from maestro.data.filters import EmailFilters
+from maestro.data.models import Email
+from maestro.data.repository import SqlAlchemyEmailRepository
+from maestro.gmail.client import GoogleGmailClient
+from maestro.nlp.embeddings import EmbeddingModel, FaissEmbeddingIndex
+from maestro.nlp.indexing import FacetIndex, IndexGeneration, WordIndex
+from maestro.nlp.summarizer import Summarizer
+from maestro.processing.html_cleaner import HTMLCleaner
+from maestro.processing.near_duplicates import NearDuplicateIndex, index_path_for
+from maestro.services.email_ingestion import EmailIngestionService
+from maestro.services.summary_service import SummaryService
+
+logger = logging.getLogger(__name__)
+
+_MAILBOX_RE = re.compile(r"[^a-z0-9._@-]+")
+
+# (sort key, mailbox, email id); lower sort keys rank first.
+ShardHit = Tuple[float, str, int]
+
+
+def mailbox_key(name: str) -> str:
+    """Normalize a mailbox name (usually the account address) into a directory name."""
+    key = _MAILBOX_RE.sub("_", name.strip().lower()).strip("._")
+    if not key:
+        raise ValueError(f"Invalid mailbox name: {name!r}")
+    return key
+
+
+def _database_url(path: Path) -> str:
+    return f"sqlite:///{path / 'maestro.db'}"
+
+
+def _index_path(path: Path) -> Path:
+    return path / "faiss.index"
+
+
+@dataclass
+class MailboxShard:
+    """Storage and indexes for one mailbox, opened lazily."""
+
+    name: str
+    path: Path
+    dim: int
+    summarizer: Optional[Summarizer] = None
+    generation: IndexGeneration = field(default_factory=IndexGeneration)
+    word_index: WordIndex = field(default_factory=WordIndex)
+
+    @cached_property
+    def repository(self) -> SqlAlchemyEmailRepository:
+        self.path.mkdir(parents=True, exist_ok=True)
+        return SqlAlchemyEmailRepository(_database_url(self.path))
+
+    @cached_property
+    def embedding_index(self) -> FaissEmbeddingIndex:
+        return FaissEmbeddingIndex(dim=self.dim, index_path=_index_path(self.path))
+
+    @cached_property
+    def facet_index(self) -> FacetIndex:
+        facets = FacetIndex()
+        facets.build(self.repository.facet_rows())
+        summaries = self.__dict__.get("summary_service")
+        if summaries is not None:
+            summaries.facet_index = facets
+        return facets
+
+    @cached_property
+    def near_duplicates(self) -> NearDuplicateIndex:
+        return NearDuplicateIndex(index_path_for(_database_url(self.path)))
+
+    @cached_property
+    def summary_service(self) -> Optional[SummaryService]:
+        if self.summarizer is None:
+            return None
+        # Search hydration must not load every facet row of the shard; link the facet index only once
+        # ingestion has built it (see ``facet_index``).
+        return SummaryService(self.repository, self.summarizer, facet_index=self.__dict__.get("facet_index"))
+
+
+class ShardManager:
+    """Open, create and ingest into per-mailbox shards."""
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel,
+        dim: int,
+        root: Path | None = None,
+        cleaner: HTMLCleaner | None = None,
+        summarizer: Summarizer | None = None,
+    ) -> None:
+        self.embedding_model = embedding_model
+        self.dim = dim
+        self.root = Path(root or settings.mailboxes_dir)
+        self.cleaner = cleaner
+        self.summarizer = summarizer
+        self._shards: Dict[str, MailboxShard] = {}
+        self._lock = threading.Lock()
+
+    def list_mailboxes(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(path.name for path in self.root.iterdir() if path.is_dir())
+
+    def shard(self, mailbox: str) -> MailboxShard:
+        key = mailbox_key(mailbox)
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is None:
+                shard = MailboxShard(key, self.root / key, self.dim, summarizer=self.summarizer)
+                self._shards[key] = shard
+            return shard
+
+    def ingestion_service(self, mailbox: str) -> EmailIngestionService:
+        """Build an ingestion pipeline that writes only to ``mailbox``'s shard."""
+        shard = self.shard(mailbox)
+        return EmailIngestionService(
+            gmail_client=GoogleGmailClient(token_path=shard.path / "token.json"),
+            repository=shard.repository,
+            cleaner=self.cleaner or HTMLCleaner(),
+            embedding_model=self.embedding_model,
+            embedding_index=shard.embedding_index,
+            summarizer=self.summarizer,
+            word_index=shard.word_index,
+            facet_index=shard.facet_index,
+            generation=shard.generation,
+            near_duplicates=shard.near_duplicates,
+        )
+
+    def sync_mailbox(self, mailbox: str, max_results: int = 200) -> int:
+        return self.ingestion_service(mailbox).sync_gmail(max_results=max_results)
+
+
+class _ShardSearcher:
+    """Answers shard-local searches; lives in a worker process (or in-process)."""
+
+    def __init__(self, root: Path, dim: int) -> None:
+        self.root = root
+        self.dim = dim
+        self._indexes: Dict[str, Tuple[Tuple[int, int], FaissEmbeddingIndex]] = {}
+        self._repositories: Dict[str, SqlAlchemyEmailRepository] = {}
+
+    def run(self, op: str, mailboxes: Sequence[str], payload: dict) -> List[ShardHit]:
+        hits: List[ShardHit] = []
+        for mailbox in mailboxes:
+            if op == "semantic":
+                hits.extend(self._semantic(mailbox, **payload))
+            else:
+                hits.extend(self._keyword(mailbox, **payload))
+        return heapq.nsmallest(payload["limit"], hits)
+
+    def _semantic(self, mailbox: str, vector: np.ndarray, limit: int, filters: EmailFilters | None) -> List[ShardHit]:
+        allowed_ids = None
+        if filters is not None and not filters.is_empty():
+            allowed_ids = np.asarray(self._repository(mailbox).filter_ids(filters), dtype="int64")
+        results = self._index(mailbox).search(vector, k=limit, allowed_ids=allowed_ids)
+        return [(distance, mailbox, email_id) for email_id, distance in results]
+
+    def _keyword(self, mailbox: str, query: str, limit: int, filters: EmailFilters | None) -> List[ShardHit]:
+        emails = self._repository(mailbox).search_by_keyword(query, limit=limit, filters=filters)
+        # Newest first: negate the timestamp so lower keys still rank first.
+        return [(-email.date.timestamp(), mailbox, email.id) for email in emails]
+
+    def _index(self, mailbox: str) -> FaissEmbeddingIndex:
+        path = _index_path(self.root / mailbox)
+        stat = path.stat() if path.exists() else None
+        # Persisting renames a fresh file into place, so inode + mtime identify a version.
+        version = (stat.st_ino, stat.st_mtime_ns) if stat else (0, 0)
+        cached = self._indexes.get(mailbox)
+        if cached is None or cached[0] != version:
+            cached = (version, FaissEmbeddingIndex(dim=self.dim, index_path=path, use_gpu=False, autosave=False))
+            self._indexes[mailbox] = cached
+        return cached[1]
+
+    def _repository(self, mailbox: str) -> SqlAlchemyEmailRepository:
+        repository = self._repositories.get(mailbox)
+        if repository is None:
+            repository = SqlAlchemyEmailRepository(_database_url(self.root / mailbox))
+            self._repositories[mailbox] = repository
+        return repository
+
+
+def _worker_main(conn, root: str, dim: int) -> None:
+    searcher = _ShardSearcher(Path(root), dim)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        op, mailboxes, payload = message
+        try:
+            conn.send(("ok", searcher.run(op, mailboxes, payload)))
+        except Exception as exc:  # report to the caller instead of killing the worker
+            conn.send(("error", f"{type(exc).__name__}: {exc}"))
+
+
+class ShardWorkerPool:
+    """Worker processes that each own a fixed subset of shards.
+
+    A mailbox always maps to the same worker, so each FAISS index is loaded
+    into exactly one process and stays warm there between queries.
+    """
+
+    def __init__(self, root: Path, dim: int, workers: int | None = None) -> None:
+        self.root = root
+        self.dim = dim
+        self.size = workers or settings.shard_workers or 1
+        self._context = multiprocessing.get_context("spawn")
+        self._start_lock = threading.Lock()
+        # Replaced wholesale, never mutated, so readers always see a complete list.
+        self._workers: List[Tuple[multiprocessing.Process, object, threading.Lock]] = []
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        with self._start_lock:
+            if self._workers:
+                return
+            self._workers = [self._spawn(i) for i in range(self.size)]
+        logger.info("Started %s shard workers", self.size)
+
+    def stop(self) -> None:
+        with self._start_lock:
+            workers, self._workers = self._workers, []
+        for process, conn, lock in workers:
+            with lock:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+            process.join(timeout=5)
+
+    def worker_for(self, mailbox: str) -> int:
+        return zlib.crc32(mailbox.encode("utf-8")) % self.size
+
+    def scatter(self, op: str, mailboxes: Sequence[str], payload: dict) -> List[ShardHit]:
+        self.start()
+        groups: Dict[int, List[str]] = {}
+        for mailbox in mailboxes:
+            groups.setdefault(self.worker_for(mailbox), []).append(mailbox)
+        with ThreadPoolExecutor(max_workers=max(1, len(groups))) as executor:
+            parts = executor.map(lambda item: self._ask(item[0], op, item[1], payload), groups.items())
+            return [hit for part in parts for hit in part]
+
+    def _spawn(self, worker: int) -> Tuple[multiprocessing.Process, object, threading.Lock]:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main, args=(child_conn, str(self.root), self.dim), name=f"shard-worker-{worker}", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return process, parent_conn, threading.Lock()
+
+    def _respawn(self, worker: int, conn) -> None:
+        """Replace a dead worker, unless another thread already did."""
+        with self._start_lock:
+            if not self._workers or self._workers[worker][1] is not conn:
+                return
+            process = self._workers[worker][0]
+            process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+            conn.close()
+            workers = list(self._workers)
+            workers[worker] = self._spawn(worker)
+            self._workers = workers
+        logger.warning("Restarted shard worker %s (exit code %s)", worker, process.exitcode)
+
+    def _ask(self, worker: int, op: str, mailboxes: List[str], payload: dict) -> List[ShardHit]:
+        for attempt in range(2):
+            _, conn, lock = self._workers[worker]
+            try:
+                with lock:
+                    conn.send((op, mailboxes, payload))
+                    status, result = conn.recv()
+                break
+            except (EOFError, OSError) as exc:
+                # The worker process died (crash, OOM kill); start a fresh one and retry once.
+                self._respawn(worker, conn)
+                if attempt:
+                    raise RuntimeError(f"Shard worker {worker} died: {type(exc).__name__}") from exc
+        if status != "ok":
+            raise RuntimeError(f"Shard worker {worker} failed: {result}")
+        return result
+
+
+@dataclass
+class MailboxHit:
+    mailbox: str
+    email: Email
+
+
+class ScatterGatherSearch:
+    """Fan a query out to the selected shards and merge their top-k hits.
+
+    The query is embedded once here; shard workers only run FAISS and SQL.
+    Without a worker pool, shards are searched in-process, which is the
+    cheapest path for a single tenant.
+    """
+
+    def __init__(self, manager: ShardManager, pool: ShardWorkerPool | None = None) -> None:
+        self.manager = manager
+        self.pool = pool
+        self._local = _ShardSearcher(manager.root, manager.dim)
+        self._local_lock = threading.Lock()
+
+    def search(
+        self,
+        query: str,
+        mode: str = "semantic",
+        limit: int = 20,
+        filters: EmailFilters | None = None,
+        mailboxes: Iterable[str] | None = None,
+    ) -> List[MailboxHit]:
+        selected = [mailbox_key(m) for m in mailboxes] if mailboxes else self.manager.list_mailboxes()
+        selected = [m for m in selected if (self.manager.root / m).is_dir()]
+        if not selected:
+            return []
+        if mode == "keyword":
+            hits = self._gather("keyword", selected, {"query": query, "limit": limit, "filters": filters})
+        elif mode == "hybrid":
+            semantic = self._semantic(query, selected, limit, filters)
+            keyword = self._gather("keyword", selected, {"query": query, "limit": limit, "filters": filters})
+            seen = {(mailbox, email_id) for _, mailbox, email_id in semantic}
+            hits = semantic + [hit for hit in keyword if (hit[1], hit[2]) not in seen]
+        else:
+            hits = self._semantic(query, selected, limit, filters)
+        return self._hydrate(hits[:limit])
+
+    def _semantic(self, query: str, selected: List[str], limit: int, filters: EmailFilters | None) -> List[ShardHit]:
+        vector = self.manager.embedding_model.embed_texts([query])
+        return self._gather("semantic", selected, {"vector": vector, "limit": limit, "filters": filters})
+
+    def _gather(self, op: str, selected: List[str], payload: dict) -> List[ShardHit]:
+        if self.pool is not None and len(selected) > 1:
+            hits = self.pool.scatter(op, selected, payload)
+        else:
+            with self._local_lock:
+                hits = self._local.run(op, selected, payload)
+        return heapq.nsmallest(payload["limit"], hits)
+
+    def _hydrate(self, hits: List[ShardHit]) -> List[MailboxHit]:
+        by_mailbox: Dict[str, List[int]] = {}
+        for _, mailbox, email_id in hits:
+            by_mailbox.setdefault(mailbox, []).append(email_id)
+        emails: Dict[Tuple[str, int], Email] = {}
+        for mailbox, ids in by_mailbox.items():
+            shard = self.manager.shard(mailbox)
+            found = shard.repository.get_emails(ids)
+            if shard.summary_service is not None:
+                shard.summary_service.ensure_summaries(found)
+            emails.update(((mailbox, email.id), email) for email in found)
+        return [
+            MailboxHit(mailbox, emails[(mailbox, email_id)])
+            for _, mailbox, email_id in hits
+            if (mailbox, email_id) in emails
+        ]
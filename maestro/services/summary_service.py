@@ -0,0 +1,113 @@
+"""On-demand summarization with idle-time backfill."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import List
+
+from maestro.core.config import settings
+from maestro.data.models import Email
+from maestro.data.repository import EmailRepository
+from maestro.nlp.indexing import FacetIndex
+from maestro.nlp.summarizer import Summarizer
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryService:
+    """Fill in missing summaries when emails are about to be shown or used.
+
+    A near-duplicate takes its representative's summary, so each cluster is
+    summarized once.
+    """
+
+    def __init__(
+        self,
+        repository: EmailRepository,
+        summarizer: Summarizer,
+        batch_size: int | None = None,
+        facet_index: FacetIndex | None = None,
+    ) -> None:
+        self.repository = repository
+        self.summarizer = summarizer
+        self.facet_index = facet_index
+        self.batch_size = batch_size or settings.summary_batch_size
+        # The summarization pipeline is not safe to call from several threads at once.
+        self._lock = threading.Lock()
+        self.last_demand = 0.0
+
+    def ensure_summaries(self, emails: List[Email]) -> List[Email]:
+        """Summarize, in one batch, the emails that have no summary yet."""
+        missing = [email for email in emails if email.summary is None]
+        if missing:
+            self.last_demand = time.monotonic()
+            self._summarize(missing)
+        return emails
+
+    def backfill(self, limit: int | None = None) -> int:
+        """Summarize one batch of the most recent unsummarized emails."""
+        emails = self.repository.list_unsummarized(limit=limit or self.batch_size)
+        if emails:
+            self._summarize(emails)
+        return len(emails)
+
+    def _summarize(self, emails: List[Email]) -> None:
+        with self._lock:
+            # Another caller may have filled these in while we waited.
+            emails = [email for email in emails if email.summary is None]
+            if not emails:
+                return
+            representative_ids = sorted({email.duplicate_of for email in emails if email.duplicate_of is not None})
+            representatives = {email.id: email for email in self.repository.get_emails(representative_ids)}
+            sources = {email.id: representatives.get(email.duplicate_of, email) for email in emails}
+            pending = {source.id: source for source in sources.values() if source.summary is None}
+            texts = [source.new_content or source.plain_text for source in pending.values()]
+            summaries = self.summarizer.summarize_batch(texts) if texts else []
+            for source, summary in zip(pending.values(), summaries):
+                source.summary = summary
+            for email in emails:
+                email.summary = sources[email.id].summary
+            updated = {email.id: email.summary for email in [*emails, *pending.values()]}
+            self.repository.update_summaries(updated)
+            if self.facet_index is not None:
+                self.facet_index.mark_summarized(updated)
+
+
+class SummaryBackfillWorker:
+    """Background thread that backfills summaries while nobody is asking for them."""
+
+    def __init__(self, summary_service: SummaryService, idle_seconds: float | None = None) -> None:
+        self.summary_service = summary_service
+        self.idle_seconds = idle_seconds if idle_seconds is not None else settings.summary_backfill_idle_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="summary-backfill", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            idle_for = time.monotonic() - self.summary_service.last_demand
+            if idle_for < self.idle_seconds:
+                self._stop.wait(self.idle_seconds - idle_for)
+                continue
+            try:
+                done = self.summary_service.backfill()
+            except Exception:  # keep the worker alive across transient model/db errors
+                logger.exception("Summary backfill failed")
+                done = 0
+            if done:
+                logger.info("Backfilled %s summaries", done)
+            else:
+                self._stop.wait(self.idle_seconds)
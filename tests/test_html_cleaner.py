@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("lxml")
+pytest.importorskip("bs4")
+pytest.importorskip("html2text")
+
+from maestro.processing.html_cleaner import HTMLCleaner, looks_like_html  # noqa: E402
+
+REPLY = (
+    "Sounds good, see you then.\n"
+    "\n"
+    "On Mon, Jan 1, 2024 at 9:00 AM Alice <alice@example.com> wrote:\n"
+    "> Can we meet on Tuesday?\n"
+    "> Details: <https://example.com/agenda>\n"
+)
+
+
+def test_plain_text_reply_header_is_not_html():
+    assert not looks_like_html(REPLY)
+
+
+def test_markup_is_detected():
+    assert looks_like_html("<html><body><p>Hi</p></body></html>")
+    assert looks_like_html("Hello<br/>world")
+    assert looks_like_html("<DIV class='x'>Hi</DIV>")
+
+
+def test_plain_text_keeps_lines_and_addresses():
+    text = HTMLCleaner(mode="fast", workers=1).to_plain_text(REPLY)
+    assert text.splitlines() == [
+        "Sounds good, see you then.",
+        "On Mon, Jan 1, 2024 at 9:00 AM Alice <alice@example.com> wrote:",
+        "> Can we meet on Tuesday?",
+        "> Details: <https://example.com/agenda>",
+    ]
+
+
+def test_xml_declaration_is_parsed_as_markup():
+    html = '<?xml version="1.0" encoding="utf-8"?>\n<html><head><style>p {color: red}</style></head><body><p>Hi</p></body></html>'
+    assert HTMLCleaner(mode="fast", workers=1).to_plain_text(html) == "Hi"
+
+
+def test_comment_only_body_yields_no_markup():
+    assert HTMLCleaner(mode="fast", workers=1).to_plain_text("<!-- tracking: 1234 -->") == ""
@@ -0,0 +1,98 @@
+import random
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("sqlalchemy")
+
+from maestro.processing.near_duplicates import NearDuplicateIndex  # noqa: E402
+from maestro.processing.reply_parser import ReplyParser  # noqa: E402
+
+_WORDS = (
+    "invoice contract renewal meeting agenda budget forecast deadline shipment order delivery "
+    "schedule review approval payment quarter report customer onboarding migration release"
+).split()
+
+
+def _parent() -> str:
+    rng = random.Random(0)
+    return "\n".join(" ".join(rng.choice(_WORDS) for _ in range(20)) for _ in range(20))
+
+
+def _reply(parent: str) -> str:
+    quoted = "\n".join(f"> {line}" for line in parent.splitlines())
+    return (
+        "Thanks, I will look at the numbers tomorrow and get back to you.\n\n"
+        f"On Mon, Jan 1, 2024 at 9:00 AM Alice <alice@example.com> wrote:\n{quoted}\n"
+    )
+
+
+def test_reply_quoting_its_parent_is_not_a_near_duplicate(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "test.lsh", threshold=0.9)
+    parent = _parent()
+    index.add("parent", index.signature(parent))
+    assert index.match(index.signature(ReplyParser().new_content(_reply(parent)))) is None
+
+
+def test_resent_copy_is_a_near_duplicate(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "test.lsh", threshold=0.9)
+    parent = _parent()
+    index.add("parent", index.signature(parent))
+    assert index.match(index.signature(ReplyParser().new_content(parent))) == "parent"
+
+
+def test_ingestion_does_not_cluster_a_reply_with_its_parent(tmp_path):
+    for module in ("lxml", "bs4", "html2text", "faiss", "torch", "sentence_transformers", "transformers", "googleapiclient"):
+        pytest.importorskip(module)
+    from maestro.gmail.client import RawGmailEmail
+    from maestro.services.email_ingestion import EmailIngestionService
+
+    class Gmail:
+        def fetch_emails(self, max_results=100):
+            def raw(gmail_id, body):
+                date = datetime(2024, 1, 1)
+                return RawGmailEmail(gmail_id, "thread", body, "Numbers", "a@example.com", "b@example.com", None, None, date)
+
+            parent = _parent()
+            return [raw("parent", parent), raw("reply", _reply(parent)), raw("resent", parent)]
+
+    class Cleaner:
+        def clean_many(self, htmls):
+            return list(htmls)
+
+    class Repository:
+        def __init__(self):
+            self.stored = {}
+
+        def save_emails(self, emails):
+            for email in emails:
+                email.id = len(self.stored) + 1
+                self.stored[email.gmail_id] = email
+
+        def get_by_gmail_ids(self, gmail_ids):
+            return [self.stored[gmail_id] for gmail_id in gmail_ids if gmail_id in self.stored]
+
+    class Coordinator:
+        embedding_index = None
+
+        def index_emails(self, emails):
+            pass
+
+    repository = Repository()
+    service = EmailIngestionService(
+        gmail_client=Gmail(),
+        repository=repository,
+        cleaner=Cleaner(),
+        embedding_model=None,
+        embedding_index=None,
+        summarizer=None,
+        word_index=None,
+        summarize_on_ingest=False,
+        near_duplicates=NearDuplicateIndex(tmp_path / "test.lsh", threshold=0.9),
+        near_duplicate_mode="reuse",
+    )
+    service.index_coordinator = Coordinator()
+    service.sync_gmail()
+    assert repository.stored["reply"].duplicate_of is None
+    assert repository.stored["resent"].duplicate_of == repository.stored["parent"].id
@@ -0,0 +1,52 @@
+from maestro.processing.reply_parser import ReplyParser
+
+parser = ReplyParser()
+
+
+def test_top_posted_reply():
+    text = "Works for me.\n\nOn Mon, Jan 1, 2024 at 9:00 AM Alice <alice@example.com> wrote:\n> Tuesday at 10?\n"
+    assert parser.new_content(text) == "Works for me."
+
+
+def test_bottom_posted_reply():
+    text = (
+        "On Mon, Jan 1, 2024 at 9:00 AM Alice <alice@example.com> wrote:\n"
+        "> Tuesday at 10?\n"
+        "> Or Wednesday?\n"
+        "\n"
+        "Tuesday works, see you then.\n"
+    )
+    assert parser.new_content(text) == "Tuesday works, see you then."
+
+
+def test_interleaved_reply():
+    text = (
+        "On Mon, Jan 1, 2024 at 9:00 AM Alice\n"
+        "<alice@example.com> wrote:\n"
+        "> Can you send the invoice?\n"
+        "Attached.\n"
+        "> And the contract?\n"
+        "Next week.\n"
+        "--\n"
+        "Bob\n"
+    )
+    assert parser.new_content(text) == "Attached.\nNext week."
+
+
+def test_unquoted_outlook_history_is_dropped():
+    text = (
+        "Thanks, approved.\n"
+        "\n"
+        "From: Alice\n"
+        "Sent: Monday, January 1, 2024 9:00 AM\n"
+        "To: Bob\n"
+        "Subject: Budget\n"
+        "\n"
+        "Please approve the budget.\n"
+    )
+    assert parser.new_content(text) == "Thanks, approved."
+
+
+def test_forward_without_comment_falls_back_to_full_text():
+    text = "---------- Forwarded message ---------\nFrom: Alice\nHello"
+    assert parser.new_content(text) == text